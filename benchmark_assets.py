@@ -0,0 +1,380 @@
+"""
+Asset Tooling Benchmarks
+Times optimize_image, create_tagline_image and LocalImageVerifier on a
+deterministic synthetic corpus (assorted sizes, RGB/RGBA/P modes and
+categories), recording images/sec and peak memory as JSON. Verification
+runs against a tiny stand-in model, so no BLIP download is needed.
+Each benchmark runs in a fresh process so its peak memory is its own.
+With --compare, exits non-zero when throughput regresses past a threshold
+"""
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from optimize_images import peak_rss_mb
+
+RESULTS_FILE = 'benchmark_results.json'
+RESULTS_VERSION = 1
+DEFAULT_SEED = 1234
+DEFAULT_IMAGES = 36
+DEFAULT_TAGLINES = 40
+DEFAULT_THRESHOLD = 0.10
+VERIFY_BATCH_SIZE = 8
+
+CORPUS_SIZES = ((320, 240), (800, 600), (1600, 1200), (3000, 2000))
+CORPUS_MODES = ('RGB', 'RGBA', 'P')
+CORPUS_CATEGORIES = {
+    'animals': ['Lion', 'Elephant', 'Giraffe', 'Zebra', 'Monkey', 'Tiger'],
+    'food': ['Samosa', 'Pizza', 'Dosa', 'Burger', 'Biryani', 'Noodles'],
+    'vehicles': ['Bus', 'Truck', 'Bicycle', 'Scooter', 'Train', 'Boat'],
+}
+TAGLINE_WORDS = ('just', 'do', 'it', 'think', 'different', 'the', 'best', 'a', 'man', 'can', 'get',
+                 'because', "you're", 'worth', 'taste', 'feel', 'every', 'drop', 'of', 'happiness',
+                 'extraordinary', 'connecting', 'people', 'everywhere', 'tomorrow')
+
+def generate_corpus(corpus_dir, count=DEFAULT_IMAGES, seed=DEFAULT_SEED):
+    """
+    Write `count` synthetic images cycling through CORPUS_SIZES x CORPUS_MODES x categories.
+    RGB images are saved as JPEG, RGBA and P as PNG. Returns [(path, item, category)].
+    """
+    categories = list(CORPUS_CATEGORIES)
+    items = []
+    for i in range(count):
+        rng = np.random.default_rng(seed + i)
+        width, height = CORPUS_SIZES[i % len(CORPUS_SIZES)]
+        mode = CORPUS_MODES[(i // len(CORPUS_SIZES)) % len(CORPUS_MODES)]
+        category = categories[i % len(categories)]
+        names = CORPUS_CATEGORIES[category]
+        name = names[(i // len(categories)) % len(names)]
+
+        # Smooth gradient background plus a few shapes and some grain
+        y, x = np.mgrid[0:height, 0:width]
+        base = rng.uniform(0, 255, size=(2, 3))
+        t = ((x / width + y / height) / 2)[..., None]
+        pixels = base[0] * (1 - t) + base[1] * t + rng.normal(0, 6, size=(height, width, 3))
+        img = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), 'RGB')
+        draw = ImageDraw.Draw(img)
+        for _ in range(6):
+            x0, y0 = rng.uniform(0, width * 0.8), rng.uniform(0, height * 0.8)
+            box = (x0, y0, x0 + rng.uniform(0.1, 0.5) * width, y0 + rng.uniform(0.1, 0.5) * height)
+            draw.ellipse(box, fill=tuple(int(c) for c in rng.integers(0, 256, 3)))
+
+        if mode == 'RGBA':
+            alpha = np.clip(255 * (1.2 - np.hypot(x / width - 0.5, y / height - 0.5) * 2), 0, 255)
+            img.putalpha(Image.fromarray(alpha.astype(np.uint8), 'L'))
+        elif mode == 'P':
+            img = img.quantize(colors=64)
+
+        folder = os.path.join(corpus_dir, category)
+        os.makedirs(folder, exist_ok=True)
+        extension = 'jpg' if mode == 'RGB' else 'png'
+        path = os.path.join(folder, f"{name.lower()}_{i:03d}.{extension}")
+        if mode == 'RGB':
+            img.save(path, 'JPEG', quality=95)
+        else:
+            img.save(path, 'PNG')
+        items.append((path, name, category))
+    return items
+
+def generate_taglines(count=DEFAULT_TAGLINES, seed=DEFAULT_SEED):
+    """Deterministic taglines from 1 to 14 words, some with one very long word"""
+    rng = np.random.default_rng(seed)
+    taglines = []
+    for i in range(count):
+        words = list(rng.choice(TAGLINE_WORDS, size=1 + i % 14))
+        if i % 9 == 0:
+            words.append('supercalifragilisticexpialidocious')
+        taglines.append(' '.join(words).capitalize())
+    return taglines
+
+class StandInProcessor:
+    """Stand-in for a BLIP processor: 96px preprocessing and a word-level tokenizer."""
+
+    def __init__(self, vocabulary, size=96):
+        self.vocabulary = ['<pad>', '<unk>'] + list(vocabulary)
+        self.ids = {word: i for i, word in enumerate(self.vocabulary)}
+        self.image_processor = _StandInImageProcessor(size)
+        self.tokenizer = self._tokenize
+
+    def _tokenize(self, texts, padding=True, return_tensors='pt'):
+        import torch
+        rows = [[self.ids.get(word, 1) for word in text.lower().rstrip('?').split()] for text in texts]
+        length = max(len(row) for row in rows)
+        return _Encoded(input_ids=torch.tensor([row + [0] * (length - len(row)) for row in rows]))
+
+    def batch_decode(self, ids, skip_special_tokens=True):
+        return [' '.join(self.vocabulary[i] for i in row.tolist() if i > 1) for row in ids]
+
+class _StandInImageProcessor:
+    """Resize and normalize to a (N, 3, size, size) tensor, like BlipImageProcessor."""
+
+    def __init__(self, size):
+        self.size = size
+
+    def __call__(self, images, return_tensors='pt'):
+        import torch
+        arrays = [np.asarray(img.resize((self.size, self.size), Image.Resampling.BICUBIC), dtype=np.float32)
+                  for img in images]
+        pixels = (np.stack(arrays) / 255.0 - 0.5) / 0.5
+        return {'pixel_values': torch.from_numpy(pixels.transpose(0, 3, 1, 2).copy())}
+
+    def to_dict(self):
+        return {'size': self.size}
+
+class _Encoded(dict):
+    """Tokenizer output that, like a BatchEncoding, can be moved to a device."""
+
+    def to(self, device):
+        return self
+
+def make_stand_in_model(vocabulary_size, seed=DEFAULT_SEED):
+    """A tiny conv net with a BLIP-like generate(pixel_values, input_ids=None, max_length=...)."""
+    import torch
+    from torch import nn
+
+    class StandInModel(nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.features = nn.Sequential(nn.Conv2d(3, 16, 5, stride=4), nn.ReLU(),
+                                          nn.Conv2d(16, 32, 3, stride=2), nn.ReLU(),
+                                          nn.AdaptiveAvgPool2d(1), nn.Flatten())
+            self.head = nn.Linear(32, vocabulary_size)
+            self.question = nn.Embedding(vocabulary_size, vocabulary_size)
+
+        @torch.no_grad()
+        def generate(self, pixel_values=None, input_ids=None, max_length=20, **kwargs):
+            logits = self.head(self.features(pixel_values))
+            if input_ids is not None:
+                logits = logits + self.question(input_ids).mean(dim=1)
+            return logits.topk(min(3, max_length), dim=1).indices
+
+    torch.manual_seed(seed)
+    return StandInModel().eval()
+
+def make_stand_in_verifier(vocabulary, seed=DEFAULT_SEED):
+    """A LocalImageVerifier whose processors and models are the stand-ins (CPU only)."""
+    from verify_images_with_ai import LocalImageVerifier
+
+    verifier = LocalImageVerifier()
+    processor = StandInProcessor(vocabulary)
+    model = make_stand_in_model(len(processor.vocabulary), seed)
+    verifier._device = 'cpu'
+    verifier._caption_processor = verifier._vqa_processor = processor
+    verifier._caption_model = verifier._vqa_model = model
+    return verifier
+
+def _measure(run, count):
+    """Time run() and return throughput plus this process's memory figures"""
+    start_rss = peak_rss_mb()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    return {
+        'images': count,
+        'seconds': round(seconds, 4),
+        'images_per_sec': round(count / seconds, 3) if seconds > 0 else None,
+        'start_rss_mb': start_rss,
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def bench_optimize(items, work_dir):
+    """optimize_image over a fresh copy of the corpus (it rewrites files in place)"""
+    from optimize_images import optimize_image
+    paths = []
+    for i, (path, _, _) in enumerate(items):
+        copy = os.path.join(work_dir, f"{i:03d}{os.path.splitext(path)[1]}")
+        shutil.copyfile(path, copy)
+        paths.append(copy)
+
+    def run():
+        for path in paths:
+            result = optimize_image(path, force=True)
+            if not result['success']:
+                raise RuntimeError(f"{path}: {result['error']}")
+    return _measure(run, len(paths))
+
+def bench_taglines(taglines, work_dir):
+    """create_tagline_image for every synthetic tagline"""
+    from generate_tagline_images import create_tagline_image
+
+    def run():
+        for i, tagline in enumerate(taglines):
+            create_tagline_image(tagline, f"Brand {i}", os.path.join(work_dir, f"tagline_{i:03d}.jpg"))
+    return _measure(run, len(taglines))
+
+def bench_verify_image(items, seed):
+    """LocalImageVerifier.verify_image, one image at a time"""
+    vocabulary = ['a', 'photo', 'of', 'yes', 'no'] + [n.lower() for names in CORPUS_CATEGORIES.values()
+                                                      for n in names]
+    verifier = make_stand_in_verifier(vocabulary, seed)
+    return _measure(lambda: [verifier.verify_image(*item) for item in items], len(items))
+
+def bench_verify_batch(items, seed):
+    """LocalImageVerifier.verify_batch with prefetching, VERIFY_BATCH_SIZE images per batch"""
+    vocabulary = ['a', 'photo', 'of', 'yes', 'no'] + [n.lower() for names in CORPUS_CATEGORIES.values()
+                                                      for n in names]
+    verifier = make_stand_in_verifier(vocabulary, seed)
+    batches = [items[i:i + VERIFY_BATCH_SIZE] for i in range(0, len(items), VERIFY_BATCH_SIZE)]
+
+    def run():
+        for batch, preprocessed in verifier.prefetch_batches(batches):
+            verifier.verify_batch(batch, preprocessed)
+    return _measure(run, len(items))
+
+def _run_benchmark(name, items, taglines, seed):
+    """Child-process entry point for one benchmark run"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        if name == 'optimize_image':
+            return bench_optimize(items, work_dir)
+        if name == 'create_tagline_image':
+            return bench_taglines(taglines, work_dir)
+        if name == 'verify_image':
+            return bench_verify_image(items, seed)
+        return bench_verify_batch(items, seed)
+
+BENCHMARKS = ('optimize_image', 'create_tagline_image', 'verify_image', 'verify_batch')
+
+def run_benchmarks(names=BENCHMARKS, image_count=DEFAULT_IMAGES, tagline_count=DEFAULT_TAGLINES,
+                   seed=DEFAULT_SEED, repeat=3, output_file=RESULTS_FILE):
+    """
+    Run each benchmark `repeat` times in fresh processes and keep the fastest run.
+    Returns the results dict (also written to output_file).
+    """
+    results = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'pillow': Image.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'corpus': {'seed': seed, 'images': image_count, 'taglines': tagline_count,
+                   'sizes': [list(s) for s in CORPUS_SIZES], 'modes': list(CORPUS_MODES),
+                   'categories': list(CORPUS_CATEGORIES)},
+        'benchmarks': {}
+    }
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        # Generated in a child too: a process's peak RSS starts from its parent's RSS at fork
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            items = pool.submit(generate_corpus, corpus_dir, image_count, seed).result()
+        taglines = generate_taglines(tagline_count, seed)
+        results['corpus']['bytes'] = sum(os.path.getsize(path) for path, _, _ in items)
+
+        for name in names:
+            runs = []
+            for _ in range(repeat):
+                # A fresh process per run, so peak RSS belongs to this benchmark alone
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    try:
+                        runs.append(pool.submit(_run_benchmark, name, items, taglines, seed).result())
+                    except ImportError as e:
+                        print(f"{name}: skipped ({e})")
+                        break
+            if not runs:
+                results['benchmarks'][name] = {'skipped': True}
+                continue
+
+            best = max(runs, key=lambda r: r['images_per_sec'] or 0)
+            best['runs'] = [r['images_per_sec'] for r in runs]
+            results['benchmarks'][name] = best
+            peak = f", peak RSS {best['peak_rss_mb']:.0f} MB" if best['peak_rss_mb'] is not None else ""
+            print(f"{name:<22}{best['images_per_sec']:>10.2f} images/sec "
+                  f"({best['images']} in {best['seconds']:.2f}s{peak})")
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to: {output_file}")
+    return results
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD, selected=None):
+    """
+    Print each benchmark's change against the baseline.
+    Returns the names whose throughput dropped by more than `threshold` (a fraction),
+    plus any in `selected` (default: those in results) that the baseline measured
+    but this run skipped, left out or could not time. Unselected benchmarks are not compared.
+    """
+    failures = []
+    current_benchmarks = results['benchmarks']
+    baseline_benchmarks = baseline.get('benchmarks', {})
+    selected = set(current_benchmarks if selected is None else selected)
+    print(f"\n{'Benchmark':<22}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    print("-" * 70)
+    for name in list(current_benchmarks) + [n for n in baseline_benchmarks if n not in current_benchmarks]:
+        current = current_benchmarks.get(name)
+        previous = baseline_benchmarks.get(name)
+        if (name not in selected or not previous or previous.get('skipped')
+                or previous.get('images_per_sec') is None):
+            # Nothing to compare against
+            print(f"{name:<22}{'-':>12}{'-':>12}{'n/a':>10}")
+            continue
+        if current is None or current.get('skipped') or current.get('images_per_sec') is None:
+            failures.append(name)
+            status = 'NOT RUN' if current is None else 'SKIPPED' if current.get('skipped') else 'NO TIMING'
+            print(f"{name:<22}{previous['images_per_sec']:>12.2f}{'-':>12}{'n/a':>10}  {status}")
+            continue
+        change = current['images_per_sec'] / previous['images_per_sec'] - 1
+        flag = ""
+        if change < -threshold:
+            failures.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<22}{previous['images_per_sec']:>12.2f}{current['images_per_sec']:>12.2f}"
+              f"{change * 100:>+9.1f}%{flag}")
+    print("-" * 70)
+    if baseline.get('environment') != results['environment']:
+        print("Note: baseline was recorded on a different environment")
+    return failures
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the asset tooling on a synthetic corpus")
+    parser.add_argument('benchmark', nargs='*',
+                        help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument('--images', type=int, default=DEFAULT_IMAGES,
+                        help=f"Synthetic corpus size (default: {DEFAULT_IMAGES})")
+    parser.add_argument('--taglines', type=int, default=DEFAULT_TAGLINES,
+                        help=f"Synthetic taglines (default: {DEFAULT_TAGLINES})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help=f"Corpus seed (default: {DEFAULT_SEED})")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark, fastest kept (default: 3)")
+    parser.add_argument('--output', default=RESULTS_FILE, help=f"Results file (default: {RESULTS_FILE})")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="Compare against a stored results file and fail on regressions")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed throughput drop as a fraction (default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args()
+    unknown = [name for name in args.benchmark if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark {', '.join(unknown)} (expected {', '.join(BENCHMARKS)})")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print("=" * 70)
+    print("ASSET TOOLING BENCHMARKS")
+    print("=" * 70)
+    print()
+
+    results = run_benchmarks(args.benchmark or BENCHMARKS, image_count=args.images, tagline_count=args.taglines,
+                             seed=args.seed, repeat=max(1, args.repeat), output_file=args.output)
+    if baseline is not None:
+        failures = compare_results(results, baseline, args.threshold, selected=args.benchmark or BENCHMARKS)
+        if failures:
+            print(f"Regressed more than {args.threshold:.0%} or not measured: {', '.join(failures)}")
+            sys.exit(1)
+        print(f"No throughput regressions beyond {args.threshold:.0%}")
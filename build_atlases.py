@@ -0,0 +1,267 @@
+"""
+Image Atlas Builder
+Packs each category's images into a few sprite sheets so the game can
+preload a whole category in 1-3 requests instead of one per item.
+Items are packed at the size the game displays them, and categories drawn
+as vector tagline cards are left out
+"""
+import json
+import os
+from pathlib import Path
+from PIL import Image
+
+from optimize_images import open_for_width
+
+ATLAS_DIR = 'atlases'
+ATLAS_INDEX = 'index.json'
+ATLAS_SIZE = 4096
+# optimize_images.py's default max width, so crops are as sharp as the originals
+ITEM_SIZE = 800
+VECTOR_MANIFEST = os.path.join('images', 'taglines', 'cards.json')
+
+class MaxRectsBin:
+    """Rectangle bin packer using the MaxRects best-short-side-fit heuristic."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free_rects = [(0, 0, width, height)]
+        self.used_rects = []
+
+    def insert(self, width, height):
+        """Place a width x height rectangle, returning (x, y) or None if it doesn't fit"""
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free_rects:
+            if width <= fw and height <= fh:
+                leftover_w = fw - width
+                leftover_h = fh - height
+                score = (min(leftover_w, leftover_h), max(leftover_w, leftover_h))
+                if best_score is None or score < best_score:
+                    best = (fx, fy)
+                    best_score = score
+
+        if best is None:
+            return None
+
+        placed = (best[0], best[1], width, height)
+        self._split_free_rects(placed)
+        self._prune_free_rects()
+        self.used_rects.append(placed)
+        return best
+
+    def _split_free_rects(self, used):
+        """Replace every free rectangle overlapping `used` with its leftover strips"""
+        ux, uy, uw, uh = used
+        new_free = []
+        for rect in self.free_rects:
+            fx, fy, fw, fh = rect
+            if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+                new_free.append(rect)
+                continue
+            if ux > fx:
+                new_free.append((fx, fy, ux - fx, fh))
+            if ux + uw < fx + fw:
+                new_free.append((ux + uw, fy, fx + fw - ux - uw, fh))
+            if uy > fy:
+                new_free.append((fx, fy, fw, uy - fy))
+            if uy + uh < fy + fh:
+                new_free.append((fx, uy + uh, fw, fy + fh - uy - uh))
+        self.free_rects = new_free
+
+    def _prune_free_rects(self):
+        """Drop free rectangles fully contained in another free rectangle"""
+        rects = self.free_rects
+        kept = []
+        for i, (ax, ay, aw, ah) in enumerate(rects):
+            contained = False
+            for j, (bx, by, bw, bh) in enumerate(rects):
+                if i != j and bx <= ax and by <= ay and ax + aw <= bx + bw and ay + ah <= by + bh:
+                    # Keep the first of two identical rectangles
+                    if (ax, ay, aw, ah) != (bx, by, bw, bh) or j < i:
+                        contained = True
+                        break
+            if not contained:
+                kept.append((ax, ay, aw, ah))
+        self.free_rects = kept
+
+    def used_extent(self):
+        """Smallest (width, height) covering every placed rectangle"""
+        if not self.used_rects:
+            return 0, 0
+        return (max(x + w for x, y, w, h in self.used_rects),
+                max(y + h for x, y, w, h in self.used_rects))
+
+def load_categories(categories_file='categories.json'):
+    """Load the category list from categories.json"""
+    with open(categories_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        return data.get('categories', data) if isinstance(data, dict) else data
+
+def load_category_items(data_file):
+    """Load a category data file (some were saved with a BOM by PowerShell)"""
+    with open(data_file, 'r', encoding='utf-8-sig') as f:
+        return json.load(f)
+
+def load_item_image(image_path, item_size):
+    """Open an image as RGB, scaled down to fit an item_size x item_size box"""
+    img, _ = open_for_width(image_path, item_size)
+    scale = min(1.0, item_size / img.width, item_size / img.height)
+    if scale < 1.0:
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        resized = img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        img.close()
+        img = resized
+    return img
+
+def pack_category(category_id, image_paths, output_dir, atlas_size=ATLAS_SIZE, item_size=ITEM_SIZE,
+                  padding=2, quality=85):
+    """
+    Pack one category's images into as few atlases as possible.
+    Returns the category's index entry (atlas files and per-item rectangles).
+    """
+    images = {}
+    for image_path in image_paths:
+        try:
+            images[image_path] = load_item_image(image_path, item_size)
+        except Exception as e:
+            print(f"   [!] {image_path}: {e}")
+
+    # Largest first packs tighter
+    order = sorted(images, key=lambda p: (images[p].height, images[p].width), reverse=True)
+
+    bins = []
+    placements = {}
+    for image_path in order:
+        img = images[image_path]
+        w, h = img.width + padding, img.height + padding
+        for bin_index, packer in enumerate(bins):
+            position = packer.insert(w, h)
+            if position is not None:
+                break
+        else:
+            packer = MaxRectsBin(atlas_size, atlas_size)
+            bins.append(packer)
+            bin_index = len(bins) - 1
+            position = packer.insert(w, h)
+        placements[image_path] = (bin_index, position[0], position[1])
+
+    atlases = []
+    for bin_index, packer in enumerate(bins):
+        width, height = packer.used_extent()
+        sheet = Image.new('RGB', (width, height), (255, 255, 255))
+        for image_path, (placed_bin, x, y) in placements.items():
+            if placed_bin == bin_index:
+                sheet.paste(images[image_path], (x, y))
+
+        atlas_path = Path(output_dir) / f"{category_id}-{bin_index}.jpg"
+        sheet.save(atlas_path, 'JPEG', quality=quality, optimize=True, progressive=True)
+        sheet.close()
+        atlases.append({
+            'src': atlas_path.as_posix(),
+            'width': width,
+            'height': height,
+            'bytes': atlas_path.stat().st_size
+        })
+
+    items = {}
+    for image_path, (bin_index, x, y) in placements.items():
+        img = images[image_path]
+        items[image_path] = {'atlas': bin_index, 'x': x, 'y': y, 'w': img.width, 'h': img.height}
+        img.close()
+
+    return {'atlases': atlases, 'items': items}
+
+def load_vector_cards(vector_manifest=VECTOR_MANIFEST):
+    """Image paths drawn as SVG cards by generate_tagline_images.py"""
+    try:
+        with open(vector_manifest, 'r', encoding='utf-8') as f:
+            return set(json.load(f).get('cards', {}))
+    except (OSError, ValueError):
+        return set()
+
+def build_atlases(categories_file='categories.json', output_dir=ATLAS_DIR, atlas_size=ATLAS_SIZE,
+                  item_size=ITEM_SIZE, padding=2, quality=85):
+    """
+    Build atlases for every category and write the atlas index JSON.
+    """
+    if item_size + padding > atlas_size:
+        print(f"Error: item size {item_size}px does not fit in a {atlas_size}px atlas")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    categories = load_categories(categories_file)
+    vector_cards = load_vector_cards()
+
+    print(f"Building atlases (atlas={atlas_size}px, item={item_size}px, quality={quality}%)...")
+    print("-" * 70)
+
+    index = {}
+    total_individual = 0
+    total_atlas = 0
+    total_requests_before = 0
+    total_requests_after = 0
+
+    for category in categories:
+        category_id = category['id']
+        data_file = category.get('dataFile')
+        if not data_file or not os.path.exists(data_file):
+            print(f"Skipping {category['name']} - no data file found")
+            continue
+
+        image_paths = []
+        for item in load_category_items(data_file):
+            image_path = item.get('image')
+            if image_path and os.path.exists(image_path) and image_path not in image_paths:
+                image_paths.append(image_path)
+        if not image_paths:
+            continue
+        if any(path in vector_cards for path in image_paths):
+            # SVG cards need no image request at all
+            print(f"Skipping {category['name']} - drawn as vector cards")
+            continue
+
+        entry = pack_category(category_id, image_paths, output_dir, atlas_size=atlas_size,
+                              item_size=item_size, padding=padding, quality=quality)
+        index[category_id] = entry
+
+        individual_bytes = sum(os.path.getsize(p) for p in entry['items'])
+        atlas_bytes = sum(a['bytes'] for a in entry['atlases'])
+        total_individual += individual_bytes
+        total_atlas += atlas_bytes
+        total_requests_before += len(entry['items'])
+        total_requests_after += len(entry['atlases'])
+
+        print(f"{category['name']}: {len(entry['items'])} images -> {len(entry['atlases'])} atlases, "
+              f"{individual_bytes / 1024:.1f} KB -> {atlas_bytes / 1024:.1f} KB")
+
+    index_path = os.path.join(output_dir, ATLAS_INDEX)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump({'categories': index}, f, separators=(',', ':'))
+
+    print("-" * 70)
+    print(f"\nAtlases Complete!")
+    print(f"Requests: {total_requests_before} -> {total_requests_after}")
+    print(f"Individual files: {total_individual / (1024 * 1024):.2f} MB")
+    print(f"Atlases: {total_atlas / (1024 * 1024):.2f} MB")
+    print(f"Index saved to: {index_path}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack each category's images into sprite atlases")
+    parser.add_argument('--atlas-size', type=int, default=ATLAS_SIZE,
+                        help=f"Max atlas width/height (default: {ATLAS_SIZE})")
+    parser.add_argument('--item-size', type=int, default=ITEM_SIZE,
+                        help=f"Max item width/height (default: {ITEM_SIZE})")
+    parser.add_argument('--padding', type=int, default=2, help="Gap between items in pixels (default: 2)")
+    parser.add_argument('--quality', type=int, default=85, help="Atlas JPEG quality (default: 85)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("IMAGE ATLAS BUILDER")
+    print("=" * 70)
+    print()
+
+    build_atlases(atlas_size=args.atlas_size, item_size=args.item_size,
+                  padding=args.padding, quality=args.quality)
@@ -0,0 +1,178 @@
+"""
+Game Data Bundle Builder
+Validates every category data file against categories.json and compiles
+them into one minified bundle, so the game starts with a single request.
+Image paths and categories are interned as integer indexes, with an
+image -> category table for constant-time lookups during play
+"""
+import gzip
+import json
+import os
+from pathlib import Path
+
+BUNDLE_FILE = 'data_bundle.json'
+BUNDLE_VERSION = 1
+REQUIRED_CATEGORY_FIELDS = ('id', 'name', 'dataFile')
+REQUIRED_ITEM_FIELDS = ('image', 'name')
+# Column order for item rows; unknown fields are appended after these
+ITEM_FIELDS = ('image', 'name', 'nameHi', 'id', 'tagline')
+
+def load_categories(categories_file='categories.json'):
+    """Load the category list from categories.json"""
+    with open(categories_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        return data.get('categories', data) if isinstance(data, dict) else data
+
+def validate_data(categories, check_images=True):
+    """
+    Load and check every data file referenced by categories.json.
+    Returns (loaded, errors, warnings) where loaded is [(category, items)].
+    """
+    loaded = []
+    errors = []
+    warnings = []
+    seen_ids = set()
+
+    for number, category in enumerate(categories):
+        label = category.get('id', f"#{number}")
+        missing = [field for field in REQUIRED_CATEGORY_FIELDS if not category.get(field)]
+        if missing:
+            errors.append(f"category {label}: missing {', '.join(missing)}")
+            continue
+        if category['id'] in seen_ids:
+            errors.append(f"category {label}: duplicate id")
+            continue
+        seen_ids.add(category['id'])
+
+        data_file = category['dataFile']
+        if not os.path.exists(data_file):
+            errors.append(f"category {label}: data file {data_file} not found")
+            continue
+        try:
+            # Some data files were saved with a BOM by PowerShell
+            with open(data_file, 'r', encoding='utf-8-sig') as f:
+                items = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            errors.append(f"{data_file}: {e}")
+            continue
+        if not isinstance(items, list):
+            errors.append(f"{data_file}: expected a list of items")
+            continue
+
+        images_in_category = set()
+        for position, item in enumerate(items):
+            where = f"{data_file}[{position}]"
+            if not isinstance(item, dict):
+                errors.append(f"{where}: expected an object")
+                continue
+            missing = [field for field in REQUIRED_ITEM_FIELDS if not item.get(field)]
+            if missing:
+                errors.append(f"{where}: missing {', '.join(missing)}")
+                continue
+            if item['image'] in images_in_category:
+                warnings.append(f"{where}: image {item['image']} used twice in {label}")
+            images_in_category.add(item['image'])
+            if check_images and not os.path.exists(item['image']):
+                warnings.append(f"{where}: image {item['image']} not found")
+
+        if not items:
+            warnings.append(f"{data_file}: no items")
+        loaded.append((category, items))
+
+    return loaded, errors, warnings
+
+def compile_bundle(loaded):
+    """
+    Build the bundle dict. Items become rows in ITEM_FIELDS column order with the
+    image replaced by its index in `images`; `imageCategory[i]` is the index of the
+    first category using image i.
+    """
+    fields = list(ITEM_FIELDS)
+    for _, items in loaded:
+        for item in items:
+            fields.extend(key for key in item if key not in fields)
+
+    images = []
+    image_index = {}
+    image_category = []
+    categories = []
+    for category_number, (category, items) in enumerate(loaded):
+        rows = []
+        for item in items:
+            path = item['image']
+            if path not in image_index:
+                image_index[path] = len(images)
+                images.append(path)
+                image_category.append(category_number)
+            row = [image_index[path]] + [item.get(field) for field in fields[1:]]
+            # Trailing empty columns are implied
+            while row and row[-1] is None:
+                row.pop()
+            rows.append(row)
+        entry = {key: value for key, value in category.items() if key != 'dataFile'}
+        entry['items'] = rows
+        categories.append(entry)
+
+    return {
+        'version': BUNDLE_VERSION,
+        'fields': fields,
+        'categories': categories,
+        'images': images,
+        'imageCategory': image_category
+    }
+
+def build_data_bundle(categories_file='categories.json', output_file=BUNDLE_FILE, check_images=True):
+    """
+    Validate the data files and write the bundle. Nothing is written if any
+    data file fails validation. Returns True on success.
+    """
+    categories = load_categories(categories_file)
+    loaded, errors, warnings = validate_data(categories, check_images=check_images)
+
+    for warning in warnings:
+        print(f"[!] {warning}")
+    for error in errors:
+        print(f"[X] {error}")
+    if errors:
+        print(f"\n{len(errors)} errors - bundle not written")
+        return False
+
+    bundle = compile_bundle(loaded)
+    payload = json.dumps(bundle, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    tmp_path = f"{output_file}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, output_file)
+
+    source_files = [categories_file] + [category['dataFile'] for category, _ in loaded]
+    source_bytes = sum(os.path.getsize(path) for path in source_files)
+    source_gzip = sum(len(gzip.compress(Path(path).read_bytes())) for path in source_files)
+    item_count = sum(len(items) for _, items in loaded)
+
+    print("-" * 70)
+    print(f"Categories: {len(loaded)}, items: {item_count}, unique images: {len(bundle['images'])}")
+    print(f"Warnings: {len(warnings)}")
+    print(f"Fetches: {len(source_files)} -> 1")
+    print(f"Size: {source_bytes / 1024:.1f} KB -> {len(payload) / 1024:.1f} KB "
+          f"(gzipped {source_gzip / 1024:.1f} KB -> {len(gzip.compress(payload)) / 1024:.1f} KB)")
+    print(f"Bundle saved to: {output_file}")
+    print("Re-run after editing categories.json or any data file")
+    return True
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Validate the game data and compile it into one bundle")
+    parser.add_argument('--output', default=BUNDLE_FILE, help=f"Bundle path (default: {BUNDLE_FILE})")
+    parser.add_argument('--skip-image-check', action='store_true',
+                        help="Don't warn about image files missing on disk")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("GAME DATA BUNDLE BUILDER")
+    print("=" * 70)
+    print()
+
+    if not build_data_bundle(output_file=args.output, check_images=not args.skip_image_check):
+        sys.exit(1)
@@ -0,0 +1,220 @@
+"""
+Static Site Builder
+Copies the game into an output directory with content-hashed filenames
+(lion.png -> lion.3f2a9c1b7e.png) and rewrites every reference to them,
+so hashed assets can be cached forever and only index.html (and sw.js)
+are revalidated.
+Text assets also get precompressed .gz (and .br, if brotli is installed)
+copies. File hashes are cached by size and mtime, so unchanged files are
+never re-read
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+
+from optimize_images import load_manifest, save_manifest
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+OUTPUT_DIR = '_site'
+HASH_CACHE = '.build_cache.json'
+# Keep their names; emitted in this order, so sw.js sees the final hashed names
+ENTRY_POINTS = ('index.html', 'sw.js')
+HASH_LENGTH = 10
+TEXT_EXTENSIONS = {'.html', '.js', '.css', '.json', '.svg'}
+ASSET_EXTENSIONS = TEXT_EXTENSIONS | {'.png', '.jpg', '.jpeg', '.webp', '.avif', '.gif', '.ico',
+                                      '.wav', '.mp3', '.ogg', '.m4a'}
+MIN_COMPRESS_BYTES = 256
+# Quoted strings and unquoted CSS url(...) values that may be asset paths
+REFERENCE_PATTERN = re.compile(r'''(?<=["'(])([\w./-][^"'()\s<>]*)(?=["')])''')
+
+class SiteBuilder:
+    """Emits each reachable asset once, after the assets it references."""
+
+    def __init__(self, root='.', output_dir=OUTPUT_DIR, cache_file=HASH_CACHE):
+        self.root = Path(root).resolve()
+        self.output = Path(output_dir).resolve()
+        self.cache_file = cache_file
+        self.hash_cache = load_manifest(cache_file)
+        self.new_cache = {}
+        self.emitted = {}        # source path -> output path (both site-relative)
+        self.in_progress = set()
+        self.stats = {'hashed': 0, 'reused': 0, 'copied': 0, 'compressed': 0}
+
+    def asset_path(self, reference):
+        """Site-relative path for a reference to a local asset, or None"""
+        if '://' in reference or reference.startswith(('data:', '/', '#')):
+            return None
+        path = reference[2:] if reference.startswith('./') else reference
+        if Path(path).suffix.lower() not in ASSET_EXTENSIONS:
+            return None
+        full = (self.root / path).resolve()
+        if self.root not in full.parents or self.output in full.parents or not full.is_file():
+            return None
+        return full.relative_to(self.root).as_posix()
+
+    def source_hash(self, path):
+        """SHA-256 of a source file, reused while its size and mtime are unchanged"""
+        stat = (self.root / path).stat()
+        entry = self.hash_cache.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            self.stats['reused'] += 1
+            digest = entry['sha256']
+        else:
+            self.stats['hashed'] += 1
+            sha = hashlib.sha256()
+            with open(self.root / path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+        self.new_cache[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        return digest
+
+    def rewrite(self, path, text):
+        """Emit every asset the text references and point the references at the hashed names"""
+        if path.endswith('.json'):
+            # Walk parsed JSON so only whole string values are treated as paths
+            def walk(value):
+                if isinstance(value, str):
+                    return self.reference(path, value)
+                if isinstance(value, list):
+                    return [walk(v) for v in value]
+                if isinstance(value, dict):
+                    return {walk(k): walk(v) for k, v in value.items()}
+                return value
+            return json.dumps(walk(json.loads(text)), separators=(',', ':'), ensure_ascii=False)
+        return REFERENCE_PATTERN.sub(lambda m: self.reference(path, m.group(1)), text)
+
+    def reference(self, from_path, value):
+        """The hashed replacement for one string, or the string itself"""
+        target = self.asset_path(value)
+        if target is None or target in ENTRY_POINTS:
+            return value
+        if target in self.in_progress:
+            print(f"[!] {from_path}: circular reference to {target}, left unhashed")
+            return value
+        return self.emit(target)
+
+    def emit(self, path):
+        """Write one asset (and its dependencies) to the output; returns its output path"""
+        if path in self.emitted:
+            return self.emitted[path]
+        self.in_progress.add(path)
+
+        source = self.root / path
+        is_text = source.suffix.lower() in TEXT_EXTENSIONS
+        if is_text:
+            data = self.rewrite(path, source.read_text(encoding='utf-8-sig')).encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()
+        else:
+            data = None
+            digest = self.source_hash(path)
+
+        if path in ENTRY_POINTS:
+            output_path = path
+        else:
+            output_path = Path(path).with_suffix(f".{digest[:HASH_LENGTH]}{source.suffix}").as_posix()
+
+        target = self.output / output_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Hashed names only ever hold one content, so an existing file is already correct
+        if path in ENTRY_POINTS or not target.exists():
+            if data is None:
+                shutil.copyfile(source, target)
+            else:
+                target.write_bytes(data)
+            self.stats['copied'] += 1
+        if is_text:
+            self.compress(target, data, force=path in ENTRY_POINTS)
+
+        self.in_progress.discard(path)
+        self.emitted[path] = output_path
+        return output_path
+
+    def compress(self, target, data, force=False):
+        """Write .gz / .br siblings when they are smaller than the original"""
+        if len(data) < MIN_COMPRESS_BYTES:
+            return
+        encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            encoders.append(('.br', lambda d: brotli.compress(d, quality=11)))
+        for suffix, encode in encoders:
+            compressed_path = target.with_name(target.name + suffix)
+            if compressed_path.exists() and not force:
+                continue
+            compressed = encode(data)
+            if len(compressed) < len(data):
+                compressed_path.write_bytes(compressed)
+                self.stats['compressed'] += 1
+
+    def expected_outputs(self):
+        """Every file the current build should leave in the output directory"""
+        expected = set()
+        for output_path in self.emitted.values():
+            expected.add(output_path)
+            expected.add(output_path + '.gz')
+            expected.add(output_path + '.br')
+        return expected
+
+    def prune(self):
+        """Delete outputs from earlier builds that nothing references any more"""
+        expected = self.expected_outputs()
+        removed = 0
+        for path in sorted(self.output.rglob('*'), reverse=True):
+            relative = path.relative_to(self.output).as_posix()
+            if path.is_file() and relative not in expected:
+                path.unlink()
+                removed += 1
+            elif path.is_dir() and not any(path.iterdir()):
+                path.rmdir()
+        return removed
+
+    def build(self):
+        """Emit everything reachable from the entry points and drop stale outputs"""
+        self.output.mkdir(parents=True, exist_ok=True)
+        for entry in ENTRY_POINTS:
+            if (self.root / entry).is_file():
+                self.emit(entry)
+        removed = self.prune()
+        save_manifest(self.cache_file, self.new_cache)
+        return removed
+
+def build_site(output_dir=OUTPUT_DIR, clean=False):
+    """Build the fingerprinted site into output_dir"""
+    if clean and os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+
+    builder = SiteBuilder(output_dir=output_dir)
+    removed = builder.build()
+
+    output = Path(output_dir)
+    total_bytes = sum(p.stat().st_size for p in output.rglob('*') if p.is_file() and p.suffix not in ('.gz', '.br'))
+    stats = builder.stats
+    print(f"Assets: {len(builder.emitted)} ({stats['copied']} written, {removed} stale removed)")
+    print(f"Hashed: {stats['hashed']} files read, {stats['reused']} unchanged (hash cache)")
+    print(f"Precompressed: {stats['compressed']} files written"
+          + ("" if brotli else " (gzip only - install brotli for .br copies)"))
+    print(f"Site size: {total_bytes / (1024 * 1024):.2f} MB")
+    print(f"Output: {output_dir}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the site with content-hashed, precompressed assets")
+    parser.add_argument('--output', default=OUTPUT_DIR, help=f"Output directory (default: {OUTPUT_DIR})")
+    parser.add_argument('--clean', action='store_true', help="Delete the output directory first")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("STATIC SITE BUILDER")
+    print("=" * 70)
+    print()
+
+    build_site(output_dir=args.output, clean=args.clean)
@@ -0,0 +1,299 @@
+"""
+Image Embedding Index
+Stores one CLIP embedding per image and per item name in memory-mapped
+NumPy arrays, so a whole category can be checked with a single matrix multiply.
+Runs completely offline after initial model download.
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from optimize_images import file_hash, load_manifest, save_manifest
+
+EMBEDDING_MODEL = "openai/clip-vit-base-patch32"
+INDEX_DIR = '.embedding_index'
+TEXT_PROMPT = "a photo of a {}"
+
+
+class EmbeddingIndex:
+    """Memory-mapped image/text embedding index with lazily loaded model and arrays."""
+
+    def __init__(self, index_dir: str = INDEX_DIR, model_name: str = EMBEDDING_MODEL):
+        self.index_dir = index_dir
+        self.model_name = model_name
+        self.meta_path = os.path.join(index_dir, 'index.json')
+        self.image_path = os.path.join(index_dir, 'images.npy')
+        self.text_path = os.path.join(index_dir, 'texts.npy')
+
+        self.meta = load_manifest(self.meta_path)
+        if self.meta.get('model') != model_name:
+            # Embeddings from another model are not comparable (or even the same width); start over
+            self.meta = {'model': model_name, 'images': {}, 'texts': {}}
+            for path in (self.image_path, self.text_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self._model = None
+        self._processor = None
+        self._image_matrix = None
+        self._text_matrix = None
+
+    def _load_model(self):
+        """Load the CLIP model on first use."""
+        if self._model is None:
+            import torch
+            from transformers import CLIPModel, CLIPProcessor
+            print(f"Loading embedding model {self.model_name}...")
+            self._processor = CLIPProcessor.from_pretrained(self.model_name)
+            self._model = CLIPModel.from_pretrained(self.model_name)
+            self._model.eval()
+            self._torch = torch
+        return self._model, self._processor
+
+    @property
+    def image_matrix(self) -> np.ndarray:
+        """Image embeddings, memory-mapped read-only (rows are paged in on access)."""
+        if self._image_matrix is None and os.path.exists(self.image_path):
+            self._image_matrix = np.load(self.image_path, mmap_mode='r')
+        return self._image_matrix
+
+    @property
+    def text_matrix(self) -> np.ndarray:
+        """Text embeddings, memory-mapped read-only."""
+        if self._text_matrix is None and os.path.exists(self.text_path):
+            self._text_matrix = np.load(self.text_path, mmap_mode='r')
+        return self._text_matrix
+
+    def _embed_images(self, image_paths: List[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Compute L2-normalized image embeddings.
+
+        Returns:
+            Tuple of (paths that could be read, their embeddings); unreadable images are skipped
+        """
+        from PIL import Image
+        model, processor = self._load_model()
+        loaded = []
+        images = []
+        for path in image_paths:
+            try:
+                with Image.open(path) as img:
+                    images.append(img.convert('RGB'))
+                loaded.append(path)
+            except (OSError, ValueError) as e:
+                print(f"[!] Skipping {path}: {e}")
+        if not images:
+            return [], np.empty((0, 0), dtype=np.float32)
+        with self._torch.no_grad():
+            inputs = processor(images=images, return_tensors="pt")
+            features = model.get_image_features(**inputs).numpy().astype(np.float32)
+        return loaded, features / np.linalg.norm(features, axis=1, keepdims=True)
+
+    def _embed_texts(self, names: List[str]) -> np.ndarray:
+        """Compute L2-normalized text embeddings for item names."""
+        model, processor = self._load_model()
+        prompts = [TEXT_PROMPT.format(name) for name in names]
+        with self._torch.no_grad():
+            inputs = processor(text=prompts, return_tensors="pt", padding=True)
+            features = model.get_text_features(**inputs).numpy().astype(np.float32)
+        return features / np.linalg.norm(features, axis=1, keepdims=True)
+
+    def _write_rows(self, array_path: str, attr: str, updates: Dict[int, np.ndarray], total_rows: int):
+        """Write embedding rows into an .npy file, growing it if needed."""
+        if not updates:
+            return
+        # Drop our own read-only mapping before the file is rewritten
+        setattr(self, attr, None)
+        dim = len(next(iter(updates.values())))
+        existing = np.load(array_path, mmap_mode='r') if os.path.exists(array_path) else None
+
+        if existing is not None and existing.shape[0] >= total_rows:
+            # Same size: overwrite changed rows in place
+            del existing
+            out = np.load(array_path, mmap_mode='r+')
+        else:
+            tmp_path = array_path + '.tmp.npy'
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(total_rows, dim))
+            if existing is not None:
+                out[:existing.shape[0]] = existing
+                del existing
+            out.flush()
+            del out
+            os.replace(tmp_path, array_path)
+            out = np.load(array_path, mmap_mode='r+')
+
+        for row, vector in updates.items():
+            out[row] = vector
+        out.flush()
+        del out
+
+    def update(self, image_paths: List[str], names: List[str], batch_size: int = 16) -> Tuple[int, int]:
+        """
+        Embed images whose content changed and names not yet indexed.
+
+        Returns:
+            Tuple of (images embedded, names embedded); unreadable images are left out of the index
+        """
+        os.makedirs(self.index_dir, exist_ok=True)
+        images_meta = self.meta['images']
+        texts_meta = self.meta['texts']
+
+        # Images: reuse rows whose content hash is unchanged (a path shared by categories is embedded once)
+        stale = []
+        for path in dict.fromkeys(image_paths):
+            content_hash = file_hash(path)
+            entry = images_meta.get(path)
+            if entry is None or entry['hash'] != content_hash:
+                stale.append((path, content_hash))
+
+        image_updates = {}
+        embedded = 0
+        next_row = max([e['row'] for e in images_meta.values()], default=-1) + 1
+        for start in range(0, len(stale), batch_size):
+            chunk = dict(stale[start:start + batch_size])
+            loaded, vectors = self._embed_images(list(chunk))
+            for path in chunk.keys() - set(loaded):
+                # Don't keep scoring an image against an embedding of its old content
+                images_meta.pop(path, None)
+            embedded += len(loaded)
+            for path, vector in zip(loaded, vectors):
+                content_hash = chunk[path]
+                entry = images_meta.get(path)
+                if entry is None:
+                    entry = {'row': next_row}
+                    next_row += 1
+                entry['hash'] = content_hash
+                images_meta[path] = entry
+                image_updates[entry['row']] = vector
+        self._write_rows(self.image_path, '_image_matrix', image_updates, next_row)
+
+        # Names: embedded once each
+        new_names = sorted({n for n in names if n not in texts_meta})
+        text_updates = {}
+        next_row = max(texts_meta.values(), default=-1) + 1
+        for start in range(0, len(new_names), batch_size * 4):
+            chunk = new_names[start:start + batch_size * 4]
+            for name, vector in zip(chunk, self._embed_texts(chunk)):
+                texts_meta[name] = next_row
+                text_updates[next_row] = vector
+                next_row += 1
+        self._write_rows(self.text_path, '_text_matrix', text_updates, next_row)
+
+        save_manifest(self.meta_path, self.meta)
+        return embedded, len(new_names)
+
+    def score_category(self, image_paths: List[str], names: List[str]) -> List[Dict]:
+        """
+        Score every image against every name in a category with one matrix multiply.
+
+        Returns:
+            One dict per image with its best-matching name and whether that is its own label
+        """
+        image_rows = [self.meta['images'][p]['row'] for p in image_paths]
+        text_rows = [self.meta['texts'][n] for n in names]
+
+        # Fancy indexing reads only these rows from the memory map
+        similarity = self.image_matrix[image_rows] @ self.text_matrix[text_rows].T
+        best = similarity.argmax(axis=1)
+        own = similarity[np.arange(len(names)), np.arange(len(names))]
+
+        results = []
+        for i, (path, name) in enumerate(zip(image_paths, names)):
+            best_name = names[best[i]]
+            results.append({
+                'image': path,
+                'item': name,
+                'best_match': best_name,
+                'own_score': float(own[i]),
+                'best_score': float(similarity[i, best[i]]),
+                'is_correct': best_name == name
+            })
+        return results
+
+
+def verify_with_embeddings(categories_to_check: Optional[List[str]] = None, batch_size: int = 16,
+                           report_file: str = 'image_embedding_report.json'):
+    """
+    Flag images whose best-matching name in their category is not their own label.
+
+    Args:
+        categories_to_check: List of category names to check (if None, checks all)
+        batch_size: Images per embedding forward pass
+    """
+    with open('categories.json', 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        categories = data.get('categories', data) if isinstance(data, dict) else data
+
+    index = EmbeddingIndex()
+    selected = []
+    for category in categories:
+        if categories_to_check and category['name'] not in categories_to_check:
+            continue
+        data_file = category.get('dataFile')
+        if not data_file or not os.path.exists(data_file):
+            print(f"Skipping {category['name']} - no data file found")
+            continue
+        with open(data_file, 'r', encoding='utf-8-sig') as f:
+            items = json.load(f)
+        pairs = [(item['image'], item.get('name', 'Unknown')) for item in items
+                 if item.get('image') and os.path.exists(item['image'])]
+        selected.append((category['name'], pairs))
+
+    # Embed anything new or changed (cached embeddings are reused)
+    all_images = [path for _, pairs in selected for path, _ in pairs]
+    all_names = [name for _, pairs in selected for _, name in pairs]
+    start = time.perf_counter()
+    images_embedded, names_embedded = index.update(all_images, all_names, batch_size=batch_size)
+    print(f"Embedded {images_embedded} images and {names_embedded} names "
+          f"in {time.perf_counter() - start:.1f}s")
+    selected = [(category_name, [(path, name) for path, name in pairs if path in index.meta['images']])
+                for category_name, pairs in selected]
+
+    flagged = []
+    all_results = []
+    for category_name, pairs in selected:
+        if not pairs:
+            continue
+        start = time.perf_counter()
+        results = index.score_category([p for p, _ in pairs], [n for _, n in pairs])
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        mismatches = [r for r in results if not r['is_correct']]
+        print(f"{category_name}: {len(results)} images scored in {elapsed_ms:.1f} ms, "
+              f"{len(mismatches)} flagged")
+        for r in mismatches:
+            print(f"   [X] {r['item']}: looks more like '{r['best_match']}' "
+                  f"({r['best_score']:.3f} vs {r['own_score']:.3f})")
+        for r in results:
+            r['category'] = category_name
+        all_results.extend(results)
+        flagged.extend(mismatches)
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'summary': {
+                'model': index.model_name,
+                'total_checked': len(all_results),
+                'flagged': len(flagged)
+            },
+            'flagged_images': flagged,
+            'all_results': all_results
+        }, f, indent=2, ensure_ascii=False)
+
+    print(f"\nEmbedding report saved to: {report_file}")
+    return all_results, flagged
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Zero-shot check of every image against its category's names")
+    parser.add_argument('category', nargs='*', help="Category names to check (default: all)")
+    parser.add_argument('--batch-size', type=int, default=16, help="Images per forward pass (default: 16)")
+    args = parser.parse_args()
+
+    verify_with_embeddings(categories_to_check=args.category or None, batch_size=args.batch_size)
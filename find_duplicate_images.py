@@ -0,0 +1,210 @@
+"""
+Duplicate Image Finder
+Finds the same (or nearly the same) picture saved under different item
+names using perceptual hashes (dHash + pHash) packed into 64-bit integers
+"""
+import json
+import os
+
+import numpy as np
+from PIL import Image
+
+from optimize_images import file_hash, load_manifest, open_for_width, save_manifest
+
+HASH_CACHE = os.path.join('images', '.phash_cache.json')
+DEFAULT_THRESHOLD = 6  # Max pHash bit difference to call two images near-duplicates
+
+# 32x32 orthonormal DCT-II basis, used for pHash
+_N = 32
+_DCT = np.sqrt(2 / _N) * np.cos(np.pi * (2 * np.arange(_N)[None, :] + 1) * np.arange(_N)[:, None] / (2 * _N))
+_DCT[0] /= np.sqrt(2)
+
+def load_game_images(categories_file='categories.json'):
+    """Return [{'image', 'item', 'category'}] for every existing image in the data files"""
+    with open(categories_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        categories = data.get('categories', data) if isinstance(data, dict) else data
+
+    entries = []
+    for category in categories:
+        data_file = category.get('dataFile')
+        if not data_file or not os.path.exists(data_file):
+            continue
+        with open(data_file, 'r', encoding='utf-8-sig') as f:
+            for item in json.load(f):
+                if item.get('image') and os.path.exists(item['image']):
+                    entries.append({'image': item['image'], 'item': item.get('name', 'Unknown'),
+                                    'category': category['name']})
+    return entries
+
+def pack_bits(bits):
+    """Pack an (N, 64) boolean array into N unsigned 64-bit integers"""
+    return np.packbits(bits.astype(np.uint8), axis=1).view('>u8').ravel().astype(np.uint64)
+
+def popcount(values):
+    """Number of set bits in each uint64"""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    # NumPy < 2.0: per-byte lookup table (view() needs at least one dimension, so lift scalars)
+    table = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+    array = np.atleast_1d(np.asarray(values, dtype=np.uint64))
+    counts = table[array.view(np.uint8)].reshape(array.shape + (8,)).sum(axis=-1)
+    return counts.reshape(np.shape(values))
+
+def hash_pixels(pixels_32, pixels_9x8):
+    """
+    Vectorized pHash and dHash for a batch of grayscale thumbnails.
+
+    pixels_32: (N, 32, 32) array for pHash
+    pixels_9x8: (N, 8, 9) array for dHash
+    Returns (dhashes, phashes) as uint64 arrays.
+    """
+    # dHash: is each pixel brighter than its right-hand neighbour?
+    dbits = (pixels_9x8[:, :, 1:] > pixels_9x8[:, :, :-1]).reshape(len(pixels_9x8), 64)
+
+    # pHash: low 8x8 DCT frequencies compared against their median (DC term excluded)
+    dct = np.einsum('ij,njk,lk->nil', _DCT, pixels_32, _DCT)[:, :8, :8].reshape(len(pixels_32), 64)
+    median = np.median(dct[:, 1:], axis=1, keepdims=True)
+    pbits = dct > median
+
+    return pack_bits(dbits), pack_bits(pbits)
+
+def _load_thumbnails(image_path):
+    """Decode an image once into the two grayscale thumbnails the hashes need"""
+    img, _ = open_for_width(image_path, 64)
+    gray = img.convert('L')
+    img.close()
+    small_32 = np.asarray(gray.resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    small_9x8 = np.asarray(gray.resize((9, 8), Image.Resampling.LANCZOS), dtype=np.int16)
+    return small_32, small_9x8
+
+def compute_hashes(image_paths, cache_file=HASH_CACHE, force=False):
+    """
+    Return {path: (dhash, phash)}, reusing cached hashes for unchanged files.
+    """
+    cache = {} if force else load_manifest(cache_file)
+    hashes = {}
+    todo = []
+    content_hashes = {}
+
+    for path in image_paths:
+        content_hashes[path] = file_hash(path)
+        entry = cache.get(path)
+        if entry and entry.get('hash') == content_hashes[path]:
+            hashes[path] = (int(entry['dhash'], 16), int(entry['phash'], 16))
+        else:
+            todo.append(path)
+
+    if todo:
+        thumbs_32 = []
+        thumbs_9x8 = []
+        decoded = []
+        for path in todo:
+            try:
+                small_32, small_9x8 = _load_thumbnails(path)
+            except Exception as e:
+                print(f"[!] {path}: {e}")
+                continue
+            thumbs_32.append(small_32)
+            thumbs_9x8.append(small_9x8)
+            decoded.append(path)
+
+        if decoded:
+            dhashes, phashes = hash_pixels(np.stack(thumbs_32), np.stack(thumbs_9x8))
+            for path, dhash, phash in zip(decoded, dhashes.tolist(), phashes.tolist()):
+                hashes[path] = (dhash, phash)
+
+    # Keep entries for other images (callers may hash a subset), dropping deleted files
+    new_cache = {path: entry for path, entry in cache.items() if os.path.exists(path)}
+    for path, (dhash, phash) in hashes.items():
+        new_cache[path] = {'hash': content_hashes[path], 'dhash': f"{dhash:016x}", 'phash': f"{phash:016x}"}
+    save_manifest(cache_file, new_cache)
+
+    return hashes
+
+def find_duplicate_pairs(image_paths, threshold=DEFAULT_THRESHOLD, force=False, block_size=1024):
+    """
+    Find pairs of images whose pHash differs by at most `threshold` bits.
+    Distances are computed block-by-block with vectorized XOR + popcount.
+
+    Returns a list of {'image_a', 'image_b', 'phash_distance', 'dhash_distance'}.
+    """
+    hashes = compute_hashes(sorted(set(image_paths)), force=force)
+    paths = sorted(hashes)
+    if len(paths) < 2:
+        return []
+
+    dhashes = np.array([hashes[p][0] for p in paths], dtype=np.uint64)
+    phashes = np.array([hashes[p][1] for p in paths], dtype=np.uint64)
+
+    pairs = []
+    for start in range(0, len(paths), block_size):
+        block = phashes[start:start + block_size]
+        # Compare this block only against itself and later images (upper triangle)
+        distances = popcount(block[:, None] ^ phashes[None, start:])
+        rows, cols = np.nonzero(distances <= threshold)
+        for r, c in zip(rows.tolist(), cols.tolist()):
+            i, j = start + r, start + c
+            if j <= i:
+                continue
+            pairs.append({
+                'image_a': paths[i],
+                'image_b': paths[j],
+                'phash_distance': int(distances[r, c]),
+                'dhash_distance': int(popcount(dhashes[i] ^ dhashes[j]))
+            })
+
+    pairs.sort(key=lambda p: (p['phash_distance'], p['image_a'], p['image_b']))
+    return pairs
+
+def find_duplicates(threshold=DEFAULT_THRESHOLD, force=False, report_file='duplicate_images_report.json'):
+    """Scan every game image and report near-duplicate pairs within and across categories"""
+    entries = load_game_images()
+    by_path = {}
+    for entry in entries:
+        by_path.setdefault(entry['image'], []).append(entry)
+
+    print(f"Hashing {len(by_path)} images...")
+    pairs = find_duplicate_pairs(list(by_path), threshold=threshold, force=force)
+
+    print("-" * 70)
+    for pair in pairs:
+        a = by_path[pair['image_a']][0]
+        b = by_path[pair['image_b']][0]
+        scope = "same category" if a['category'] == b['category'] else "cross-category"
+        print(f"{a['category']} - {a['item']}  <->  {b['category']} - {b['item']}  "
+              f"(pHash {pair['phash_distance']}, dHash {pair['dhash_distance']}, {scope})")
+        print(f"   {pair['image_a']}")
+        print(f"   {pair['image_b']}")
+        pair['items_a'] = [f"{e['category']} - {e['item']}" for e in by_path[pair['image_a']]]
+        pair['items_b'] = [f"{e['category']} - {e['item']}" for e in by_path[pair['image_b']]]
+
+    # The same file used by several items is also worth knowing about
+    shared = {path: [f"{e['category']} - {e['item']}" for e in items]
+              for path, items in by_path.items() if len(items) > 1}
+
+    print("-" * 70)
+    print(f"Near-duplicate pairs: {len(pairs)} (threshold {threshold} bits)")
+    print(f"Files shared by several items: {len(shared)}")
+
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({'threshold': threshold, 'pairs': pairs, 'shared_files': shared},
+                  f, indent=2, ensure_ascii=False)
+    print(f"Report saved to: {report_file}")
+    return pairs
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find duplicate and near-duplicate game images")
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f"Max pHash Hamming distance (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--force', action='store_true', help="Rehash every image, ignoring the cache")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("DUPLICATE IMAGE FINDER")
+    print("=" * 70)
+    print()
+
+    find_duplicates(threshold=args.threshold, force=args.force)
@@ -0,0 +1,130 @@
+"""
+Placeholder Generator
+Builds a tiny blurred preview (base64 WebP) and dominant color for every
+game image, so the client can paint something while the full image loads
+"""
+import base64
+import io
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from optimize_images import file_hash, load_data_image_paths, load_manifest, open_for_width, ordered_map, save_manifest
+
+PLACEHOLDER_FILE = os.path.join('images', 'placeholders.json')
+PLACEHOLDER_WIDTH = 16
+PLACEHOLDER_QUALITY = 40
+
+def dominant_color(img):
+    """Most common color of an RGB image (4-bit-per-channel histogram), as #rrggbb"""
+    pixels = np.asarray(img, dtype=np.uint8).reshape(-1, 3)
+    quantized = pixels >> 4
+    bins = (quantized[:, 0].astype(np.int32) << 8) | (quantized[:, 1].astype(np.int32) << 4) | quantized[:, 2]
+    counts = np.bincount(bins, minlength=4096)
+    # Average the real pixels in the winning bin rather than using the bin center
+    r, g, b = pixels[bins == counts.argmax()].mean(axis=0).round().astype(int)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+def compute_placeholder(image_path, width=PLACEHOLDER_WIDTH, quality=PLACEHOLDER_QUALITY):
+    """Compute the micro-preview data URI and dominant color of one image"""
+    try:
+        content_hash = file_hash(image_path)
+        # A 64px decode is plenty for both the preview and the color histogram
+        img, (source_width, source_height) = open_for_width(image_path, 64)
+        if img.width > 64:
+            small = img.resize((64, max(1, round(img.height * 64 / img.width))), Image.Resampling.BOX)
+            img.close()
+            img = small
+
+        color = dominant_color(img)
+
+        tiny = img.resize((width, max(1, round(img.height * width / img.width))), Image.Resampling.BOX)
+        buffer = io.BytesIO()
+        tiny.save(buffer, 'WEBP', quality=quality)
+        tiny.close()
+        img.close()
+
+        return {
+            'path': image_path,
+            'hash': content_hash,
+            'width': source_width,
+            'height': source_height,
+            'color': color,
+            'lqip': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+            'success': True
+        }
+
+    except Exception as e:
+        return {
+            'path': image_path,
+            'success': False,
+            'error': str(e)
+        }
+
+def _placeholder_if_changed(image_path, cached):
+    """Reuse the cached entry when the image content hash is unchanged"""
+    if cached:
+        try:
+            if cached.get('hash') == file_hash(image_path):
+                return dict(cached, path=image_path, success=True, cached=True)
+        except OSError:
+            pass
+    return compute_placeholder(image_path)
+
+def generate_placeholders(categories_file='categories.json', output_file=PLACEHOLDER_FILE,
+                          workers=1, force=False):
+    """
+    Write the placeholder sidecar for every image referenced by the data files.
+    Entries are keyed by image path and reused while the image hash is unchanged.
+    """
+    image_paths = [p for p in load_data_image_paths(categories_file) if os.path.exists(p)]
+    previous = {} if force else load_manifest(output_file)
+    cached_entries = [previous.get(p) for p in image_paths]
+
+    print(f"Generating placeholders for {len(image_paths)} images (workers={workers})...")
+    print("-" * 70)
+
+    placeholders = {}
+    computed = 0
+    reused = 0
+    failed = 0
+    for result in ordered_map(_placeholder_if_changed, image_paths, cached_entries, workers=workers):
+        if not result['success']:
+            failed += 1
+            print(f"{Path(result['path']).name}: FAILED - {result['error']}")
+            continue
+        if result.get('cached'):
+            reused += 1
+        else:
+            computed += 1
+        placeholders[result['path']] = {
+            'hash': result['hash'],
+            'width': result['width'],
+            'height': result['height'],
+            'color': result['color'],
+            'lqip': result['lqip']
+        }
+
+    save_manifest(output_file, placeholders)
+
+    total_bytes = sum(len(p['lqip']) for p in placeholders.values())
+    print(f"Computed: {computed}")
+    print(f"Reused (unchanged): {reused}")
+    print(f"Failed: {failed}")
+    if placeholders:
+        print(f"Average preview size: {total_bytes / len(placeholders):.0f} bytes")
+    print(f"Placeholders saved to: {output_file}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate instant-paint placeholders for game images")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes (0 = one per CPU core, default: 1)")
+    parser.add_argument('--force', action='store_true', help="Recompute every placeholder")
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    generate_placeholders(workers=workers, force=args.force)
@@ -0,0 +1,291 @@
+"""
+Service Worker Generator
+Writes a versioned precache manifest (the app shell, the sounds, and one
+URL list per category, each with byte sizes and content hashes) and a
+service worker that caches the shell on install and each category the
+first time it is played, so the game runs offline after the first visit.
+Only content-hashed and precached URLs are served cache-first; anything
+else goes to the network first
+"""
+import hashlib
+import json
+import os
+
+from optimize_images import file_hash
+
+PRECACHE_MANIFEST = 'precache-manifest.json'
+SERVICE_WORKER = 'sw.js'
+SHELL_FILES = ('index.html', 'script.js', 'style.css', 'categories.json')
+# Generated by the other build tools; precached when present
+OPTIONAL_SHELL_FILES = ('data_bundle.json', 'images/variants.json', 'images/placeholders.json',
+                        'atlases/index.json', 'images/taglines/cards.json', 'sounds/audio.json')
+SOUNDS_DIR = 'sounds'
+AUDIO_MANIFEST = os.path.join(SOUNDS_DIR, 'audio.json')
+ATLAS_INDEX = os.path.join('atlases', 'index.json')
+
+SERVICE_WORKER_TEMPLATE = """// Generated by generate_service_worker.py - do not edit
+const VERSION = '__VERSION__';
+const MANIFEST_URL = '__MANIFEST__';
+const SHELL_CACHE = `shell-${VERSION}`;
+const ASSET_CACHE = 'assets';
+const RUNTIME_CACHE = 'runtime';
+// build_site.py names: lion.3f2a9c1b7e.png
+const HASHED_NAME = /\\.[0-9a-f]{10}\\.[^/.]+$/;
+
+let manifestPromise = null;
+let manifestUrls = null;
+
+function loadManifest() {
+    // The worker can be stopped at any time, so re-read the manifest on demand
+    if (!manifestPromise) {
+        manifestPromise = caches.open(SHELL_CACHE)
+            .then(cache => cache.match(MANIFEST_URL))
+            .then(response => response || fetch(MANIFEST_URL, { cache: 'no-cache' }))
+            .then(response => response.json())
+            .catch(error => {
+                manifestPromise = null;
+                throw error;
+            });
+    }
+    return manifestPromise;
+}
+
+function revisions(manifest) {
+    // url -> content hash for every file in a manifest
+    const groups = [manifest.shell, manifest.sounds, ...Object.values(manifest.categories).map(c => c.files)];
+    const result = {};
+    groups.forEach(files => files.forEach(file => { result[file.url] = file.hash; }));
+    return result;
+}
+
+async function isVersioned(request) {
+    // True for content-hashed URLs and for URLs listed in the precache manifest
+    const url = new URL(request.url);
+    if (HASHED_NAME.test(url.pathname)) return true;
+    const path = decodeURI((url.origin + url.pathname).slice(self.registration.scope.length));
+    try {
+        const manifest = await loadManifest();
+        if (!manifestUrls || manifestUrls.manifest !== manifest) {
+            manifestUrls = { manifest, revisions: revisions(manifest) };
+        }
+        return path in manifestUrls.revisions;
+    } catch (error) {
+        return false;
+    }
+}
+
+async function cacheFiles(cacheName, files) {
+    const cache = await caches.open(cacheName);
+    await Promise.all(files.map(async file => {
+        if (await cache.match(file.url)) return;
+        const response = await fetch(file.url, { cache: 'no-cache' });
+        if (response.ok) await cache.put(file.url, response);
+    }));
+}
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const response = await fetch(MANIFEST_URL, { cache: 'no-cache' });
+        const cache = await caches.open(SHELL_CACHE);
+        await cache.put(MANIFEST_URL, response.clone());
+        const manifest = await response.json();
+        await cacheFiles(SHELL_CACHE, [...manifest.shell, ...manifest.sounds]);
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        // Drop cached category files whose content changed since the previous version
+        const current = revisions(await loadManifest());
+        const assets = await caches.open(ASSET_CACHE);
+        for (const name of await caches.keys()) {
+            if (!name.startsWith('shell-') || name === SHELL_CACHE) continue;
+            const oldResponse = await (await caches.open(name)).match(MANIFEST_URL);
+            if (oldResponse) {
+                const previous = revisions(await oldResponse.json());
+                await Promise.all(Object.keys(previous)
+                    .filter(url => previous[url] !== current[url])
+                    .map(url => assets.delete(url)));
+            }
+            await caches.delete(name);
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('message', event => {
+    // The page asks for a category when it is first played
+    if (!event.data || event.data.type !== 'cache-category') return;
+    event.waitUntil(loadManifest().then(manifest => {
+        const category = manifest.categories[event.data.category];
+        return category ? cacheFiles(ASSET_CACHE, category.files) : null;
+    }));
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET' || new URL(request.url).origin !== self.location.origin) return;
+    // Partial responses can't be cached; let media range requests go straight to the network
+    if (request.headers.has('range')) return;
+
+    if (request.mode === 'navigate') {
+        // Network first for the page itself, cached shell when offline
+        event.respondWith(fetch(request).catch(() => caches.match('index.html')));
+        return;
+    }
+
+    event.respondWith((async () => {
+        if (await isVersioned(request)) {
+            // Content-hashed or precached: the URL only ever holds one content
+            const cached = await caches.match(request);
+            if (cached) return cached;
+            const response = await fetch(request);
+            if (response.ok && response.type === 'basic') {
+                const cache = await caches.open(ASSET_CACHE);
+                cache.put(request, response.clone());
+            }
+            return response;
+        }
+        // Anything else may change under the same URL: network first, cache only as an offline fallback
+        try {
+            const response = await fetch(request);
+            if (response.ok && response.type === 'basic') {
+                const cache = await caches.open(RUNTIME_CACHE);
+                cache.put(request, response.clone());
+            }
+            return response;
+        } catch (error) {
+            const cached = await caches.match(request);
+            if (cached) return cached;
+            throw error;
+        }
+    })());
+});
+"""
+
+def load_categories(categories_file='categories.json'):
+    """Load the category list from categories.json"""
+    with open(categories_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        return data.get('categories', data) if isinstance(data, dict) else data
+
+def load_json(path):
+    """Load a generated JSON file, or None if it is missing or unreadable"""
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def file_entry(path):
+    """Precache entry for one file"""
+    return {'url': path, 'bytes': os.path.getsize(path), 'hash': file_hash(path)[:16]}
+
+def collect_files(paths, missing):
+    """Entries for the existing paths (each once, in order); records the rest in `missing`"""
+    entries = []
+    seen = set()
+    for path in paths:
+        if not path or path in seen:
+            continue
+        seen.add(path)
+        if os.path.isfile(path):
+            entries.append(file_entry(path))
+        else:
+            missing.append(path)
+    return entries
+
+def sound_paths(sounds_dir=SOUNDS_DIR, audio_manifest=AUDIO_MANIFEST):
+    """The files the game plays: optimized variants when optimize_audio.py has run, else the WAVs"""
+    audio = load_json(audio_manifest)
+    if audio and audio.get('sounds'):
+        return [v['src'] for entry in audio['sounds'].values() for v in entry['variants']]
+    return sorted(f"{sounds_dir}/{name}" for name in os.listdir(sounds_dir) if name.endswith('.wav'))
+
+def build_precache_manifest(categories_file='categories.json'):
+    """
+    Returns (manifest, missing paths). The manifest version is a hash of every
+    URL and content hash, so it changes whenever any precached file does.
+    """
+    categories = load_categories(categories_file)
+    missing = []
+
+    shell_paths = list(SHELL_FILES) + [p for p in OPTIONAL_SHELL_FILES if os.path.exists(p)]
+    shell_paths += [category.get('icon') for category in categories]
+    shell = collect_files(shell_paths, missing)
+    sounds = collect_files(sound_paths(), missing)
+
+    atlases = (load_json(ATLAS_INDEX) or {}).get('categories', {})
+    category_entries = {}
+    for category in categories:
+        data_file = category.get('dataFile')
+        if not data_file or not os.path.exists(data_file):
+            continue
+        with open(data_file, 'r', encoding='utf-8-sig') as f:
+            items = json.load(f)
+        paths = [data_file] + [item.get('image') for item in items]
+        paths += [atlas['src'] for atlas in atlases.get(category['id'], {}).get('atlases', [])]
+        files = collect_files(paths, missing)
+        category_entries[category['id']] = {
+            'name': category.get('name', category['id']),
+            'bytes': sum(f['bytes'] for f in files),
+            'files': files
+        }
+
+    digest = hashlib.sha256()
+    for files in [shell, sounds] + [c['files'] for c in category_entries.values()]:
+        for f in files:
+            digest.update(f"{f['url']}\0{f['hash']}\n".encode('utf-8'))
+
+    manifest = {
+        'version': digest.hexdigest()[:12],
+        'shell': shell,
+        'sounds': sounds,
+        'categories': category_entries
+    }
+    return manifest, missing
+
+def generate_service_worker(categories_file='categories.json', manifest_file=PRECACHE_MANIFEST,
+                            worker_file=SERVICE_WORKER):
+    """Write the precache manifest and the service worker, and report the storage budget"""
+    manifest, missing = build_precache_manifest(categories_file)
+
+    tmp_path = f"{manifest_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp_path, manifest_file)
+
+    worker = SERVICE_WORKER_TEMPLATE.replace('__VERSION__', manifest['version']).replace('__MANIFEST__', manifest_file)
+    with open(worker_file, 'w', encoding='utf-8') as f:
+        f.write(worker)
+
+    shell_bytes = sum(f['bytes'] for f in manifest['shell'])
+    sound_bytes = sum(f['bytes'] for f in manifest['sounds'])
+    print(f"{'Group':<28}{'Files':>7}{'Size':>12}")
+    print("-" * 70)
+    print(f"{'App shell (install)':<28}{len(manifest['shell']):>7}{shell_bytes / 1024:>9.1f} KB")
+    print(f"{'Sounds (install)':<28}{len(manifest['sounds']):>7}{sound_bytes / 1024:>9.1f} KB")
+    category_bytes = 0
+    for entry in sorted(manifest['categories'].values(), key=lambda c: c['bytes'], reverse=True):
+        category_bytes += entry['bytes']
+        print(f"{entry['name']:<28}{len(entry['files']):>7}{entry['bytes'] / 1024:>9.1f} KB")
+    print("-" * 70)
+    print(f"Installed up front: {(shell_bytes + sound_bytes) / (1024 * 1024):.2f} MB")
+    print(f"All categories played: {(shell_bytes + sound_bytes + category_bytes) / (1024 * 1024):.2f} MB")
+    if missing:
+        print(f"Skipped {len(missing)} missing files (e.g. {missing[0]})")
+    print(f"Version {manifest['version']}: {manifest_file}, {worker_file}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate the offline precache manifest and service worker")
+    parser.parse_args()
+
+    print("=" * 70)
+    print("SERVICE WORKER GENERATOR")
+    print("=" * 70)
+    print()
+
+    generate_service_worker()
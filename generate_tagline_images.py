@@ -1,80 +1,351 @@
+"""
+Tagline Card Generator
+Renders each tagline in data/taglines.json onto a card image, at the
+largest font size whose measured, wrapped lines fit the card. Cards are
+rendered across a process pool, and only cards whose text or render
+settings changed since the last run are redrawn. The same design is also
+written as compact SVG markup, with the JPEG kept as the raster fallback
+"""
+import gzip
+import hashlib
 import json
-from PIL import Image, ImageDraw, ImageFont
-import textwrap
 import os
+import time
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from PIL import Image, ImageDraw, ImageFont
 
-# Load taglines data
-with open('data/taglines.json', 'r', encoding='utf-8') as f:
-    taglines = json.load(f)
+from optimize_images import load_manifest, ordered_map, save_manifest
 
-# Create output directory if it doesn't exist
-os.makedirs('images/taglines', exist_ok=True)
+TAGLINES_FILE = 'data/taglines.json'
+OUTPUT_DIR = 'images/taglines'
+MANIFEST_FILE = os.path.join(OUTPUT_DIR, '.tagline_manifest.json')
+VECTOR_MANIFEST = os.path.join(OUTPUT_DIR, 'cards.json')
+OUTPUT_FORMATS = ('jpeg', 'svg', 'both')
+SVG_FONT_FAMILY = "Arial,Helvetica,sans-serif"
 
 # Image settings
 IMG_WIDTH = 800
 IMG_HEIGHT = 600
 BACKGROUND_COLOR = (255, 255, 255)  # White
 TEXT_COLOR = (0, 0, 0)  # Black
+QUOTE_COLOR = (200, 200, 200)
 PADDING = 60
+TEXT_MARGIN = 100  # Text box inset from each edge, leaving room for the quote marks
+FONT_PATH = "arial.ttf"
+MIN_FONT_SIZE = 24
+MAX_FONT_SIZE = 140
+LINE_SPACING = 1.25  # Line height as a multiple of the font size
+QUOTE_FONT_SIZE = 120
+JPEG_QUALITY = 95
+
+# Everything above that changes the rendered pixels; part of each card's manifest key
+RENDER_SETTINGS = {
+    'width': IMG_WIDTH,
+    'height': IMG_HEIGHT,
+    'background': BACKGROUND_COLOR,
+    'text_color': TEXT_COLOR,
+    'quote_color': QUOTE_COLOR,
+    'padding': PADDING,
+    'text_margin': TEXT_MARGIN,
+    'font': FONT_PATH,
+    'font_sizes': (MIN_FONT_SIZE, MAX_FONT_SIZE),
+    'line_spacing': LINE_SPACING,
+    'quote_font_size': QUOTE_FONT_SIZE,
+    'quality': JPEG_QUALITY,
+    'layout': 'fit-to-box'
+}
+
+# Scratch surface for measuring text
+_MEASURE_DRAW = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    """Load FONT_PATH at the given size once per process, falling back to PIL's default font"""
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        try:
+            # Pillow 10.1+ ships a scalable default font
+            return ImageFont.load_default(size=size)
+        except TypeError:
+            return ImageFont.load_default()
+
+@lru_cache(maxsize=65536)
+def measure(text, size):
+    """Rendered (left, width) of a line of text at a font size; cached since wrapping re-measures prefixes"""
+    left, _, right, _ = _MEASURE_DRAW.textbbox((0, 0), text, font=load_font(size))
+    return left, right - left
+
+def line_height(size):
+    """Line pitch for a font size, never less than the font's ascent + descent"""
+    ascent, descent = load_font(size).getmetrics()
+    return max(round(size * LINE_SPACING), ascent + descent)
+
+def wrap_to_width(text, size, max_width, break_words=False):
+    """
+    Greedy word wrap using measured widths.
+    Returns the lines, or None if a single word is wider than max_width
+    (unless break_words, which splits such words between characters).
+    """
+    lines = []
+    current = ''
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if measure(candidate, size)[1] <= max_width:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        if measure(word, size)[1] <= max_width:
+            current = word
+            continue
+        if not break_words:
+            return None
+        # Hard-break an overlong word
+        current = ''
+        for char in word:
+            if current and measure(current + char, size)[1] > max_width:
+                lines.append(current)
+                current = ''
+            current += char
+    if current:
+        lines.append(current)
+    return lines
+
+def fits(lines, size, box_width, box_height):
+    """Whether wrapped lines fit the text box at this size"""
+    return (lines is not None
+            and len(lines) * line_height(size) <= box_height
+            and all(measure(line, size)[1] <= box_width for line in lines))
+
+def layout_text(text, box_width=IMG_WIDTH - 2 * TEXT_MARGIN, box_height=IMG_HEIGHT - 2 * TEXT_MARGIN):
+    """
+    Binary-search the largest font size whose wrapped lines fit the box.
+    Returns (font_size, lines); text that doesn't fit even at MIN_FONT_SIZE is
+    hard-wrapped at that size.
+    """
+    best = None
+    low, high = MIN_FONT_SIZE, MAX_FONT_SIZE
+    while low <= high:
+        size = (low + high) // 2
+        lines = wrap_to_width(text, size, box_width)
+        if fits(lines, size, box_width, box_height):
+            best = (size, lines)
+            low = size + 1
+        else:
+            high = size - 1
+
+    if best is None:
+        best = (MIN_FONT_SIZE, wrap_to_width(text, MIN_FONT_SIZE, box_width, break_words=True))
+    return best
+
+def resolved_font():
+    """The font file load_font actually uses, or a marker for PIL's fallback font"""
+    path = getattr(load_font(MAX_FONT_SIZE), 'path', None)
+    return os.path.abspath(path) if isinstance(path, str) else 'pillow-default'
+
+def card_key(tagline_text, company_name):
+    """Manifest key for a card: its text, brand name, the render settings and the loaded font"""
+    # FONT_PATH alone would keep fallback-font cards forever once the real font is installed
+    payload = json.dumps({'tagline': tagline_text, 'name': company_name, 'settings': RENDER_SETTINGS,
+                          'resolved_font': resolved_font()},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
 
 def create_tagline_image(tagline_text, company_name, output_path):
-    """Create an image with the tagline text centered"""
+    """
+    Create an image with the tagline text centered, sized to fill the text box.
+    Returns layout info: font size, line count and layout time in ms.
+    """
+    start = time.perf_counter()
+    font_size, wrapped_lines = layout_text(tagline_text)
+    layout_ms = (time.perf_counter() - start) * 1000
+
     # Create image
     img = Image.new('RGB', (IMG_WIDTH, IMG_HEIGHT), BACKGROUND_COLOR)
     draw = ImageDraw.Draw(img)
-    
-    # Try to load a nice font, fallback to default if not available
-    try:
-        # Try different font sizes for best fit
-        font_size = 80
-        font = ImageFont.truetype("arial.ttf", font_size)
-    except:
-        font = ImageFont.load_default()
-    
-    # Wrap text if it's too long
-    max_chars_per_line = 25
-    wrapped_lines = textwrap.wrap(tagline_text, width=max_chars_per_line)
-    
+    font = load_font(font_size)
+
     # Calculate total text height
-    line_height = font_size + 20
-    total_text_height = len(wrapped_lines) * line_height
-    
+    pitch = line_height(font_size)
+    total_text_height = len(wrapped_lines) * pitch
+
     # Start y position to center the text vertically
     y_position = (IMG_HEIGHT - total_text_height) // 2
-    
-    # Draw each line centered
+
+    # Draw each line centered (measured widths, corrected for the glyphs' left bearing)
     for line in wrapped_lines:
-        # Get text bounding box to center it
-        bbox = draw.textbbox((0, 0), line, font=font)
-        text_width = bbox[2] - bbox[0]
-        x_position = (IMG_WIDTH - text_width) // 2
-        
+        left, text_width = measure(line, font_size)
+        x_position = (IMG_WIDTH - text_width) // 2 - left
+
         # Draw the text
         draw.text((x_position, y_position), line, fill=TEXT_COLOR, font=font)
-        y_position += line_height
-    
+        y_position += pitch
+
     # Add quotation marks decoratively
-    try:
-        quote_font = ImageFont.truetype("arial.ttf", 120)
-    except:
-        quote_font = font
-    
+    quote_font = load_font(QUOTE_FONT_SIZE)
+
     # Left quote
-    draw.text((PADDING, PADDING), '"', fill=(200, 200, 200), font=quote_font)
+    draw.text((PADDING, PADDING), '"', fill=QUOTE_COLOR, font=quote_font)
     # Right quote
-    draw.text((IMG_WIDTH - PADDING - 60, IMG_HEIGHT - PADDING - 100), '"', fill=(200, 200, 200), font=quote_font)
-    
+    draw.text((IMG_WIDTH - PADDING - 60, IMG_HEIGHT - PADDING - 100), '"', fill=QUOTE_COLOR, font=quote_font)
+
     # Save the image
-    img.save(output_path, 'JPEG', quality=95)
-    print(f"Created: {output_path}")
-
-# Generate images for all taglines
-for item in taglines:
-    tagline_text = item['tagline']
-    company_name = item['name']
-    filename = item['image'].split('/')[-1]
-    output_path = f"images/taglines/{filename}"
-    
-    create_tagline_image(tagline_text, company_name, output_path)
-
-print(f"\nSuccessfully created {len(taglines)} tagline images!")
+    img.save(output_path, 'JPEG', quality=JPEG_QUALITY)
+    return {'font_size': font_size, 'lines': len(wrapped_lines), 'layout_ms': layout_ms}
+
+def _svg_color(rgb):
+    """#rrggbb for an RGB tuple"""
+    return '#%02x%02x%02x' % rgb
+
+def svg_font_available():
+    """
+    True when the layout is measured with FONT_PATH itself. With PIL's fallback font
+    the line breaks would not match the Arial the SVG asks the browser for.
+    """
+    return os.path.basename(resolved_font()).lower() == os.path.basename(FONT_PATH).lower()
+
+def create_tagline_svg(tagline_text):
+    """
+    The card design as compact SVG markup, using the same measured layout as the JPEG.
+    PIL positions text by its top (ascender); SVG by its baseline, hence the ascent offsets.
+    """
+    font_size, wrapped_lines = layout_text(tagline_text)
+    pitch = line_height(font_size)
+    ascent = load_font(font_size).getmetrics()[0]
+    quote_ascent = load_font(QUOTE_FONT_SIZE).getmetrics()[0]
+    quote_fill = _svg_color(QUOTE_COLOR)
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{IMG_WIDTH}" height="{IMG_HEIGHT}" '
+        f'viewBox="0 0 {IMG_WIDTH} {IMG_HEIGHT}">',
+        f'<rect width="100%" height="100%" fill="{_svg_color(BACKGROUND_COLOR)}"/>',
+        f'<g font-family="{SVG_FONT_FAMILY}">',
+        f'<text x="{PADDING}" y="{PADDING + quote_ascent}" font-size="{QUOTE_FONT_SIZE}" fill="{quote_fill}">"</text>',
+        f'<text x="{IMG_WIDTH - PADDING - 60}" y="{IMG_HEIGHT - PADDING - 100 + quote_ascent}" '
+        f'font-size="{QUOTE_FONT_SIZE}" fill="{quote_fill}">"</text>',
+        f'<g font-size="{font_size}" fill="{_svg_color(TEXT_COLOR)}" text-anchor="middle">'
+    ]
+    y_position = (IMG_HEIGHT - len(wrapped_lines) * pitch) // 2 + ascent
+    for line in wrapped_lines:
+        parts.append(f'<text x="{IMG_WIDTH // 2}" y="{y_position}">{escape(line)}</text>')
+        y_position += pitch
+    parts.append('</g></g></svg>')
+    return ''.join(parts)
+
+def render_card(tagline_text, company_name, output_path):
+    """Render one card, returning a result dict instead of raising (safe for the process pool)"""
+    try:
+        layout = create_tagline_image(tagline_text, company_name, output_path)
+        return dict(layout, path=output_path, success=True)
+    except Exception as e:
+        return {'path': output_path, 'success': False, 'error': str(e)}
+
+def generate_tagline_images(taglines_file=TAGLINES_FILE, output_dir=OUTPUT_DIR, manifest_file=MANIFEST_FILE,
+                            workers=1, force=False, output_format='both'):
+    """
+    Build the tagline cards as JPEGs, as the SVG manifest, or both.
+    output_format: 'jpeg', 'svg' (VECTOR_MANIFEST only) or 'both'.
+    """
+    with open(taglines_file, 'r', encoding='utf-8-sig') as f:
+        taglines = json.load(f)
+
+    # Create output directory if it doesn't exist
+    os.makedirs(output_dir, exist_ok=True)
+
+    if output_format != 'svg':
+        render_jpeg_cards(taglines, output_dir, manifest_file, workers=workers, force=force)
+    if output_format != 'jpeg':
+        write_vector_cards(taglines, output_dir, force=force)
+
+def render_jpeg_cards(taglines, output_dir=OUTPUT_DIR, manifest_file=MANIFEST_FILE, workers=1, force=False):
+    """Render the JPEG cards whose manifest key changed (or whose file is missing)"""
+    previous = {} if force else load_manifest(manifest_file)
+
+    manifest = {}
+    todo = []
+    for item in taglines:
+        filename = item['image'].split('/')[-1]
+        output_path = f"{output_dir}/{filename}"
+        key = card_key(item['tagline'], item['name'])
+        if previous.get(output_path) == key and os.path.exists(output_path):
+            manifest[output_path] = key
+        else:
+            todo.append((item['tagline'], item['name'], output_path, key))
+
+    print(f"{len(taglines)} taglines: {len(manifest)} unchanged, {len(todo)} to render (workers={workers})")
+
+    failed = 0
+    layout_times = []
+    results = ordered_map(render_card, [t[0] for t in todo], [t[1] for t in todo], [t[2] for t in todo],
+                          workers=workers)
+    for (_, _, output_path, key), result in zip(todo, results):
+        if result['success']:
+            manifest[output_path] = key
+            layout_times.append(result['layout_ms'])
+            print(f"Created: {output_path} ({result['font_size']}px, {result['lines']} lines, "
+                  f"layout {result['layout_ms']:.1f} ms)")
+        else:
+            failed += 1
+            print(f"{output_path}: FAILED - {result['error']}")
+
+    # Entries for removed taglines are dropped
+    save_manifest(manifest_file, manifest)
+
+    print(f"\nRendered {len(todo) - failed} tagline images ({len(taglines) - len(todo)} unchanged, {failed} failed)")
+    if layout_times:
+        print(f"Layout time per card: {sum(layout_times) / len(layout_times):.1f} ms average, "
+              f"{max(layout_times):.1f} ms max")
+
+def write_vector_cards(taglines, output_dir=OUTPUT_DIR, vector_manifest=VECTOR_MANIFEST, force=False):
+    """
+    Write every card's SVG markup into one manifest keyed by the data file's image
+    path, so the client can show a whole category from a single small request.
+    Without FONT_PATH the manifest is left empty and the client uses the JPEGs.
+    """
+    if not svg_font_available():
+        print(f"\n[!] {FONT_PATH} not found - SVG layout can't be measured, writing no vector cards")
+        taglines = []
+    previous = {} if force else load_manifest(vector_manifest).get('cards', {})
+    cards = {}
+    jpeg_bytes = 0
+    reused = 0
+    for item in taglines:
+        key = card_key(item['tagline'], item['name'])
+        entry = previous.get(item['image'])
+        if entry and entry.get('key') == key:
+            reused += 1
+        else:
+            svg = create_tagline_svg(item['tagline'])
+            entry = {'key': key, 'svg': svg, 'bytes': len(svg.encode('utf-8'))}
+        cards[item['image']] = entry
+
+        jpeg_path = f"{output_dir}/{item['image'].split('/')[-1]}"
+        if os.path.exists(jpeg_path):
+            jpeg_bytes += os.path.getsize(jpeg_path)
+
+    payload = json.dumps({'cards': cards}, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    tmp_path = f"{vector_manifest}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, vector_manifest)
+
+    print(f"\nVector cards: {len(cards) - reused} written, {reused} unchanged -> {vector_manifest}")
+    print(f"JPEG cards: {jpeg_bytes / 1024:.1f} KB in {len(cards)} requests")
+    print(f"SVG manifest: {len(payload) / 1024:.1f} KB ({len(gzip.compress(payload)) / 1024:.1f} KB gzipped) "
+          f"in 1 request")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render tagline card images")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Number of worker processes (0 = one per CPU core, default: 0)")
+    parser.add_argument('--force', action='store_true', help="Re-render every card")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='both',
+                        help="jpeg cards, svg manifest, or both (default: both; JPEGs are the raster fallback)")
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    generate_tagline_images(workers=workers, force=args.force, output_format=args.format)
@@ -0,0 +1,273 @@
+"""
+Audio Optimizer
+Shrinks the game's WAV sounds: trims leading/trailing silence, downmixes
+to mono, resamples and peak-normalizes with NumPy, and cuts the looping
+background track down to one repeat. Writes a smaller WAV next to each
+original (correct.wav -> correct.min.wav), Opus/AAC copies when ffmpeg is
+available, and a manifest the game uses to pick the smallest playable file
+"""
+import json
+import os
+import shutil
+import subprocess
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from optimize_images import file_hash, load_manifest
+
+SOUNDS_DIR = 'sounds'
+AUDIO_MANIFEST = os.path.join(SOUNDS_DIR, 'audio.json')
+LOOPED_SOUNDS = ('background_music.wav',)
+VARIANT_SUFFIX = '.min'
+
+DEFAULT_SAMPLE_RATE = 22050
+SILENCE_DB = -45       # Relative to the sound's peak
+EDGE_PAD_MS = 10       # Silence kept around the trimmed sound
+FADE_MS = 5            # Fade at trimmed edges, so cuts don't click
+PEAK_DBFS = -1.0
+LOOP_MIN_SECONDS = 1.0
+LOOP_MATCH = 0.98      # Correlation needed to call a stretch an exact repeat
+LOOP_CROSSFADE_MS = 50
+
+# (extension, MIME type for canPlayType, ffmpeg codec arguments)
+ENCODED_FORMATS = (
+    ('ogg', 'audio/ogg; codecs="opus"', ['-c:a', 'libopus', '-b:a', '48k']),
+    ('m4a', 'audio/mp4; codecs="mp4a.40.2"', ['-c:a', 'aac', '-b:a', '64k']),
+)
+
+_SAMPLE_TYPES = {1: np.uint8, 2: '<i2', 4: '<i4'}
+
+def read_wav(path):
+    """Read a PCM WAV as float64 samples in [-1, 1], shape (frames, channels)"""
+    with wave.open(str(path), 'rb') as w:
+        channels, width, rate = w.getnchannels(), w.getsampwidth(), w.getframerate()
+        raw = w.readframes(w.getnframes())
+    if width == 3:
+        # 24-bit: widen each sample to 32 bits, keeping the sign
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        samples = (b[:, 0].astype(np.int32) << 8 | b[:, 1].astype(np.int32) << 16
+                   | b[:, 2].astype(np.int32) << 24) / 2.0 ** 31
+    elif width in _SAMPLE_TYPES:
+        samples = np.frombuffer(raw, dtype=_SAMPLE_TYPES[width]).astype(np.float64)
+        samples = (samples - 128) / 128 if width == 1 else samples / 2.0 ** (8 * width - 1)
+    else:
+        raise ValueError(f"unsupported sample width {width}")
+    return samples.reshape(-1, channels), rate
+
+def write_wav(path, samples, rate):
+    """Write mono float samples as 16-bit PCM"""
+    pcm = np.clip(np.round(samples * 32767), -32768, 32767).astype('<i2')
+    with wave.open(str(path), 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+
+def to_mono(samples):
+    """Average the channels"""
+    return samples.mean(axis=1)
+
+def trim_silence(samples, rate, silence_db=SILENCE_DB, pad_ms=EDGE_PAD_MS, fade_ms=FADE_MS):
+    """Drop leading/trailing samples quieter than silence_db below the peak"""
+    peak = np.abs(samples).max()
+    if peak == 0:
+        return samples[:0]
+    loud = np.flatnonzero(np.abs(samples) > peak * 10 ** (silence_db / 20))
+    pad = int(rate * pad_ms / 1000)
+    start = max(0, loud[0] - pad)
+    end = min(len(samples), loud[-1] + 1 + pad)
+    trimmed = samples[start:end].copy()
+
+    fade = min(int(rate * fade_ms / 1000), len(trimmed) // 2)
+    if fade:
+        ramp = np.linspace(0.0, 1.0, fade)
+        if start > 0:
+            trimmed[:fade] *= ramp
+        if end < len(samples):
+            trimmed[-fade:] *= ramp[::-1]
+    return trimmed
+
+def lowpass_kernel(cutoff, taps=63):
+    """Hann-windowed sinc low-pass filter; cutoff is a fraction of the sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff * n) * np.hanning(taps)
+    return kernel / kernel.sum()
+
+def resample(samples, rate, new_rate):
+    """Band-limit, then interpolate onto the new sample grid"""
+    if new_rate == rate or len(samples) == 0:
+        return samples
+    if new_rate < rate:
+        # Keep below the new Nyquist frequency to avoid aliasing
+        samples = np.convolve(samples, lowpass_kernel(0.45 * new_rate / rate), mode='same')
+    new_length = max(1, round(len(samples) * new_rate / rate))
+    positions = np.arange(new_length) * (rate / new_rate)
+    return np.interp(positions, np.arange(len(samples)), samples)
+
+def normalize_peak(samples, peak_dbfs=PEAK_DBFS):
+    """Scale so the loudest sample sits at peak_dbfs"""
+    peak = np.abs(samples).max() if len(samples) else 0
+    return samples if peak == 0 else samples * (10 ** (peak_dbfs / 20) / peak)
+
+def find_loop_period(samples, rate, min_seconds=LOOP_MIN_SECONDS, match=LOOP_MATCH):
+    """
+    Shortest period P (>= min_seconds) such that the track repeats itself after P
+    samples, judged by normalized autocorrelation (computed with one FFT).
+    Returns None when the track does not repeat.
+    """
+    n = len(samples)
+    spectrum = np.fft.rfft(samples, 2 * n)
+    correlation = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    # Normalize each lag by the energy of the two overlapping stretches
+    energy = np.cumsum(samples ** 2)
+    overlap = n - np.arange(n)
+    head = energy[overlap - 1]
+    tail = energy[-1] - np.concatenate(([0.0], energy[:-1]))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        normalized = correlation / np.sqrt(head * tail)
+
+    # A repeat must overlap at least one full period
+    candidates = np.arange(int(min_seconds * rate), n // 2 + 1)
+    matches = candidates[normalized[candidates] >= match]
+    return int(matches[0]) if len(matches) else None
+
+def crossfade_loop(samples, rate, length, crossfade_ms=LOOP_CROSSFADE_MS):
+    """The first `length` samples, with the following ones faded into the start so the loop is seamless"""
+    fade = min(int(rate * crossfade_ms / 1000), len(samples) - length, length)
+    looped = samples[:length].copy()
+    if fade > 0:
+        ramp = np.linspace(0.0, 1.0, fade)
+        looped[:fade] = looped[:fade] * ramp + samples[length:length + fade] * ramp[::-1]
+    return looped
+
+def encode_with_ffmpeg(wav_path, output_path, codec_args):
+    """Encode with ffmpeg; returns False when ffmpeg or the codec is unavailable"""
+    ffmpeg = shutil.which('ffmpeg')
+    if not ffmpeg:
+        return False
+    result = subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', str(wav_path), *codec_args,
+                             str(output_path)], capture_output=True)
+    if result.returncode != 0:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        return False
+    return True
+
+def optimize_sound(path, sample_rate=DEFAULT_SAMPLE_RATE, loop=False, max_loop_seconds=None):
+    """
+    Process one WAV and write its variants.
+    Returns the manifest entry (variants sorted smallest first).
+    """
+    path = Path(path)
+    samples, rate = read_wav(path)
+    original_seconds = len(samples) / rate
+    samples = to_mono(samples)
+    samples = trim_silence(samples, rate)
+
+    loop_note = None
+    if loop and len(samples):
+        period = find_loop_period(samples, rate)
+        if period is not None:
+            samples = samples[:period]
+            loop_note = f"repeats every {period / rate:.2f}s"
+        elif max_loop_seconds and len(samples) > max_loop_seconds * rate:
+            samples = crossfade_loop(samples, rate, int(max_loop_seconds * rate))
+            loop_note = f"cut to a {max_loop_seconds:g}s crossfaded loop"
+        else:
+            loop_note = "no repeat found, full length kept"
+
+    samples = resample(samples, rate, sample_rate)
+    samples = normalize_peak(samples)
+
+    wav_path = path.with_name(f"{path.stem}{VARIANT_SUFFIX}.wav")
+    write_wav(wav_path, samples, sample_rate)
+    variants = [{'src': wav_path.as_posix(), 'type': 'audio/wav', 'bytes': wav_path.stat().st_size}]
+
+    for extension, mime, codec_args in ENCODED_FORMATS:
+        encoded_path = path.with_name(f"{path.stem}{VARIANT_SUFFIX}.{extension}")
+        if encode_with_ffmpeg(wav_path, encoded_path, codec_args):
+            variants.append({'src': encoded_path.as_posix(), 'type': mime, 'bytes': encoded_path.stat().st_size})
+
+    variants.sort(key=lambda v: v['bytes'])
+    return {
+        'bytes': path.stat().st_size,
+        'seconds': round(original_seconds, 3),
+        'optimized_seconds': round(len(samples) / sample_rate, 3),
+        'loop': loop_note,
+        'variants': variants
+    }
+
+def optimize_audio(sounds_dir=SOUNDS_DIR, manifest_file=AUDIO_MANIFEST, sample_rate=DEFAULT_SAMPLE_RATE,
+                   max_loop_seconds=None, force=False):
+    """
+    Optimize every WAV in sounds_dir, reusing manifest entries for unchanged files.
+    """
+    settings = {'sample_rate': sample_rate, 'max_loop_seconds': max_loop_seconds}
+    previous = {} if force else load_manifest(manifest_file).get('sounds', {})
+    sources = sorted(p for p in Path(sounds_dir).glob('*.wav') if not p.stem.endswith(VARIANT_SUFFIX))
+
+    print(f"Optimizing {len(sources)} sounds (rate={sample_rate} Hz, "
+          f"encoder={'ffmpeg' if shutil.which('ffmpeg') else 'none - WAV only'})...")
+    print("-" * 70)
+
+    sounds = {}
+    total_before = 0
+    total_after = 0
+    for path in sources:
+        key = path.as_posix()
+        content_hash = file_hash(path)
+        entry = previous.get(key)
+        if (entry and entry.get('hash') == content_hash and entry.get('settings') == settings
+                and all(os.path.exists(v['src']) for v in entry['variants'])):
+            status = "unchanged"
+        else:
+            try:
+                entry = optimize_sound(path, sample_rate=sample_rate, loop=path.name in LOOPED_SOUNDS,
+                                       max_loop_seconds=max_loop_seconds)
+            except (OSError, ValueError, wave.Error) as e:
+                print(f"{path.name}: FAILED - {e}")
+                continue
+            entry.update(hash=content_hash, settings=settings)
+            status = "optimized"
+        sounds[key] = entry
+
+        smallest = entry['variants'][0]
+        total_before += entry['bytes']
+        total_after += smallest['bytes']
+        saved = (1 - smallest['bytes'] / entry['bytes']) * 100
+        print(f"{path.name}: {entry['bytes'] / 1024:.1f} KB -> {smallest['bytes'] / 1024:.1f} KB "
+              f"{Path(smallest['src']).suffix[1:]} ({saved:.0f}% smaller, "
+              f"{entry['seconds']:.2f}s -> {entry['optimized_seconds']:.2f}s) [{status}]")
+        if entry.get('loop'):
+            print(f"   loop: {entry['loop']}")
+
+    tmp_path = f"{manifest_file}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'sounds': sounds}, f, indent=2)
+    os.replace(tmp_path, manifest_file)
+
+    print("-" * 70)
+    if total_before:
+        print(f"Total: {total_before / 1024:.1f} KB -> {total_after / 1024:.1f} KB "
+              f"({(1 - total_after / total_before) * 100:.0f}% smaller)")
+    print(f"Manifest saved to: {manifest_file}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Trim, downmix, resample and compress the game sounds")
+    parser.add_argument('--sample-rate', type=int, default=DEFAULT_SAMPLE_RATE,
+                        help=f"Output sample rate in Hz (default: {DEFAULT_SAMPLE_RATE})")
+    parser.add_argument('--max-loop-seconds', type=float, default=None,
+                        help="If the background track has no exact repeat, cut it to a crossfaded loop this long")
+    parser.add_argument('--force', action='store_true', help="Re-process every sound")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("AUDIO OPTIMIZER")
+    print("=" * 70)
+    print()
+
+    optimize_audio(sample_rate=args.sample_rate, max_loop_seconds=args.max_loop_seconds, force=args.force)
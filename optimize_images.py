@@ -2,55 +2,231 @@
 Image Optimization Script
 Compresses and optimizes images while maintaining quality
 """
+import hashlib
+import io
+import json
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from PIL import Image
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+MANIFEST_NAME = '.optimize_manifest.json'
+
+# Responsive variants (written next to the JPEG fallback as e.g. lion.png.320w.webp)
+VARIANT_WIDTHS = (320, 480, 800)
+VARIANT_QUALITY = {'webp': 80, 'avif': 60}
+VARIANT_MANIFEST = 'variants.json'
+VARIANT_PATTERN = re.compile(r'\.\d+w\.(webp|avif)$')
+
+# Perceptual quality search (--target-ssim)
+SSIM_QUALITY_RANGE = (30, 95)
+SSIM_WINDOW = 7
+
 def get_folder_size(folder_path):
     """Calculate total size of folder in MB"""
     total_size = 0
     for dirpath, dirnames, filenames in os.walk(folder_path):
         for filename in filenames:
+            if filename == MANIFEST_NAME:
+                continue
             filepath = os.path.join(dirpath, filename)
             if os.path.exists(filepath):
                 total_size += os.path.getsize(filepath)
     return total_size / (1024 * 1024)  # Convert to MB
 
-def optimize_image(image_path, max_width=800, quality=85):
+def file_hash(file_path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    """Load the optimization manifest, or an empty one if missing/corrupt"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest_path, manifest):
+    """Write the optimization manifest atomically"""
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def flatten_to_rgb(img):
+    """Composite transparent images onto white and return an RGB image"""
+    # Convert RGBA to RGB if needed (for JPG compatibility)
+    if img.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+def _box_mean(a, size):
+    """Mean over every size x size window, via a summed-area table"""
+    c = np.pad(a.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+    return (c[size:, size:] - c[:-size, size:] - c[size:, :-size] + c[:-size, :-size]) / (size * size)
+
+def ssim(img_a, img_b, window=SSIM_WINDOW):
+    """Mean structural similarity of two same-sized images, computed on luma"""
+    a = np.asarray(img_a.convert('L'), dtype=np.float64)
+    b = np.asarray(img_b.convert('L'), dtype=np.float64)
+    window = min(window, a.shape[0], a.shape[1])
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+    
+    mu_a = _box_mean(a, window)
+    mu_b = _box_mean(b, window)
+    var_a = _box_mean(a * a, window) - mu_a * mu_a
+    var_b = _box_mean(b * b, window) - mu_b * mu_b
+    cov = _box_mean(a * b, window) - mu_a * mu_b
+    
+    ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim_map.mean())
+
+def encode_image(img, fmt, quality):
+    """Encode an image in memory and return the bytes"""
+    buffer = io.BytesIO()
+    if fmt.upper() == 'JPEG':
+        img.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buffer, fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+def search_quality(img, fmt, target_ssim, quality_range=SSIM_QUALITY_RANGE):
+    """
+    Binary-search the lowest quality whose encoding still reaches target_ssim.
+    Returns (quality, encoded_bytes); falls back to the top of the range.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for --target-ssim (pip install numpy)")
+    
+    low, high = quality_range
+    best_quality = high
+    best_data = encode_image(img, fmt, high)
+    
+    while low <= high:
+        mid = (low + high) // 2
+        data = encode_image(img, fmt, mid)
+        with Image.open(io.BytesIO(data)) as decoded:
+            score = ssim(img, decoded)
+        if score >= target_ssim:
+            best_quality, best_data = mid, data
+            high = mid - 1
+        else:
+            low = mid + 1
+    
+    return best_quality, best_data
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far in MB, or None if unsupported.
+    This is a lifetime high-water mark, not the cost of the last call."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def open_for_width(image_path, target_width):
+    """
+    Open an image as RGB, decoding JPEGs at a reduced DCT scale (1/2, 1/4, 1/8)
+    when that still leaves it at least target_width wide.
+    Returns (image, original_size).
+    """
+    with Image.open(image_path) as src:
+        original_size = src.size
+        if src.width > target_width:
+            target_height = max(1, src.height * target_width // src.width)
+            src.draft('RGB', (target_width, target_height))
+        img = flatten_to_rgb(src)
+        img.load()
+    return img, original_size
+
+def resize_to_width(img, width):
+    """LANCZOS-resize to the given width and release the larger source"""
+    height = max(1, round(img.height * width / img.width))
+    resized = img.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    img.close()
+    return resized
+
+def optimize_image(image_path, max_width=800, quality=85, cached=None, force=False, target_ssim=None):
     """
     Optimize a single image:
     - Resize if larger than max_width
     - Compress with specified quality
     - Convert to progressive JPG for faster loading
+    
+    If `cached` is the manifest entry from a previous run and the file's
+    hash and settings still match it, the image is skipped unless `force`.
+    With `target_ssim`, quality is searched per image instead of fixed.
     """
     try:
-        img = Image.open(image_path)
+        if cached and not force:
+            current_hash = file_hash(image_path)
+            if (cached.get('hash') == current_hash
+                    and cached.get('max_width') == max_width
+                    and cached.get('target_ssim') == target_ssim
+                    and (target_ssim is not None or cached.get('quality') == quality)):
+                size = os.path.getsize(image_path)
+                return {
+                    'path': image_path,
+                    'original_size': size,
+                    'new_size': size,
+                    'saved': 0,
+                    'hash': current_hash,
+                    'max_width': max_width,
+                    'quality': cached.get('quality'),
+                    'target_ssim': target_ssim,
+                    'skipped': True,
+                    'success': True
+                }
         
-        # Convert RGBA to RGB if needed (for JPG compatibility)
-        if img.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
-            img = background
+        img, _ = open_for_width(image_path, max_width)
         
         # Get original size
         original_size = os.path.getsize(image_path)
         
         # Resize if image is too large
         if img.width > max_width:
-            ratio = max_width / img.width
-            new_height = int(img.height * ratio)
-            img = img.resize((max_width, new_height), Image.Resampling.LANCZOS)
+            img = resize_to_width(img, max_width)
         
         # Save with optimization
-        img.save(
-            image_path,
-            'JPEG',
-            quality=quality,
-            optimize=True,
-            progressive=True
-        )
+        if target_ssim is not None:
+            quality, data = search_quality(img, 'JPEG', target_ssim)
+            with open(image_path, 'wb') as f:
+                f.write(data)
+        else:
+            img.save(
+                image_path,
+                'JPEG',
+                quality=quality,
+                optimize=True,
+                progressive=True
+            )
+        
+        img.close()
+        del img
         
         new_size = os.path.getsize(image_path)
         saved = original_size - new_size
@@ -60,6 +236,12 @@ def optimize_image(image_path, max_width=800, quality=85):
             'original_size': original_size,
             'new_size': new_size,
             'saved': saved,
+            'hash': file_hash(image_path),
+            'max_width': max_width,
+            'quality': quality,
+            'target_ssim': target_ssim,
+            'worker_peak_rss_mb': peak_rss_mb(),
+            'skipped': False,
             'success': True
         }
     
@@ -70,9 +252,47 @@ def optimize_image(image_path, max_width=800, quality=85):
             'error': str(e)
         }
 
-def optimize_images_in_folder(base_folder='images', max_width=800, quality=85):
+def ordered_map(func, *iterables, workers=1):
     """
-    Optimize all images in the images folder
+    Like map(), but spread across a process pool when workers > 1.
+    Results are always yielded in input order.
+    """
+    args = [list(it) for it in iterables]
+    count = len(args[0]) if args else 0
+    
+    if workers <= 1 or count <= 1:
+        yield from map(func, *args)
+        return
+    
+    # A few chunks per worker keeps IPC overhead low while still balancing load
+    chunksize = max(1, count // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, *args, chunksize=chunksize)
+
+def iter_optimize_results(image_files, max_width=800, quality=85, workers=1,
+                          cached_entries=None, force=False, target_ssim=None):
+    """
+    Yield optimize_image results in the same order as image_files.
+    With workers > 1 the images are spread across a process pool.
+    """
+    paths = [str(p) for p in image_files]
+    if cached_entries is None:
+        cached_entries = [None] * len(paths)
+    optimize = partial(optimize_image, max_width=max_width, quality=quality, force=force,
+                       target_ssim=target_ssim)
+    yield from ordered_map(_optimize_with_cache, [optimize] * len(paths), paths, cached_entries,
+                           workers=workers)
+
+def _optimize_with_cache(optimize, path, cached):
+    """Process-pool helper: call a partial of optimize_image with its manifest entry"""
+    return optimize(path, cached=cached)
+
+def optimize_images_in_folder(base_folder='images', max_width=800, quality=85, workers=1, force=False,
+                              target_ssim=None):
+    """
+    Optimize all images in the images folder.
+    Files already optimized with the same settings (per the manifest) are skipped.
+    With target_ssim, a per-category report of chosen quality and savings is printed.
     """
     base_path = Path(base_folder)
     
@@ -83,7 +303,8 @@ def optimize_images_in_folder(base_folder='images', max_width=800, quality=85):
     # Calculate initial size
     initial_size = get_folder_size(base_path)
     print(f"Initial folder size: {initial_size:.2f} MB")
-    print(f"\nOptimizing images (max_width={max_width}px, quality={quality}%)...")
+    quality_label = f"target SSIM {target_ssim}" if target_ssim is not None else f"quality={quality}%"
+    print(f"\nOptimizing images (max_width={max_width}px, {quality_label}, workers={workers})...")
     print("-" * 70)
     
     # Find all image files
@@ -91,28 +312,64 @@ def optimize_images_in_folder(base_folder='images', max_width=800, quality=85):
     image_files = []
     
     for ext in image_extensions:
-        image_files.extend(base_path.rglob(f'*{ext}'))
+        image_files.extend(p for p in base_path.rglob(f'*{ext}') if not is_variant_file(p))
     
     total_images = len(image_files)
     total_saved = 0
     successful = 0
+    skipped = 0
     failed = 0
     
-    for i, img_path in enumerate(image_files, 1):
-        result = optimize_image(str(img_path), max_width=max_width, quality=quality)
-        
+    # Load the manifest of previously optimized files
+    manifest_path = base_path / MANIFEST_NAME
+    manifest = load_manifest(manifest_path)
+    keys = [img_path.relative_to(base_path).as_posix() for img_path in image_files]
+    cached_entries = [manifest.get(key) for key in keys]
+    new_manifest = {}
+    category_stats = {}
+    peak_worker_rss = None
+    
+    results = iter_optimize_results(image_files, max_width=max_width, quality=quality, workers=workers,
+                                    cached_entries=cached_entries, force=force, target_ssim=target_ssim)
+    for i, (img_path, key, result) in enumerate(zip(image_files, keys, results), 1):
         if result['success']:
+            new_manifest[key] = {
+                'hash': result['hash'],
+                'max_width': result['max_width'],
+                'quality': result['quality'],
+                'target_ssim': result['target_ssim'],
+                'size': result['new_size']
+            }
+        
+        if result['success'] and result['skipped']:
+            skipped += 1
+            successful += 1
+            print(f"[{i}/{total_images}] {img_path.name}: Unchanged, skipped")
+        elif result['success']:
             successful += 1
             total_saved += result['saved']
             saved_kb = result['saved'] / 1024
             reduction = (result['saved'] / result['original_size'] * 100) if result['original_size'] > 0 else 0
             
+            category = Path(key).parts[0] if len(Path(key).parts) > 1 else '.'
+            stats = category_stats.setdefault(category, {'images': 0, 'quality_sum': 0, 'saved': 0})
+            stats['images'] += 1
+            stats['quality_sum'] += result['quality']
+            stats['saved'] += result['saved']
+            
+            worker_rss = result['worker_peak_rss_mb']
+            if worker_rss is not None:
+                peak_worker_rss = max(peak_worker_rss or 0, worker_rss)
+            rss = f", worker peak RSS {worker_rss:.0f} MB" if worker_rss is not None else ""
             print(f"[{i}/{total_images}] {img_path.name}: "
-                  f"Saved {saved_kb:.1f} KB ({reduction:.1f}% reduction)")
+                  f"Saved {saved_kb:.1f} KB ({reduction:.1f}% reduction, q={result['quality']}{rss})")
         else:
             failed += 1
             print(f"[{i}/{total_images}] {img_path.name}: FAILED - {result['error']}")
     
+    # Entries for deleted files are dropped; failed files keep no entry so they are retried
+    save_manifest(manifest_path, new_manifest)
+    
     # Calculate final size
     final_size = get_folder_size(base_path)
     total_saved_mb = initial_size - final_size
@@ -121,27 +378,201 @@ def optimize_images_in_folder(base_folder='images', max_width=800, quality=85):
     print(f"\nOptimization Complete!")
     print(f"Processed: {total_images} images")
     print(f"Successful: {successful}")
+    print(f"Skipped (unchanged): {skipped}")
     print(f"Failed: {failed}")
     print(f"\nInitial size: {initial_size:.2f} MB")
     print(f"Final size: {final_size:.2f} MB")
     print(f"Total saved: {total_saved_mb:.2f} MB ({(total_saved_mb/initial_size*100):.1f}% reduction)")
+    if peak_worker_rss is not None:
+        # Each worker's high-water mark over all the images it handled, not a per-image cost
+        print(f"Peak worker RSS: {peak_worker_rss:.0f} MB")
+    
+    if target_ssim is not None and category_stats:
+        print(f"\nPer-category quality (target SSIM {target_ssim}):")
+        print(f"{'Category':<20} {'Images':>7} {'Avg quality':>12} {'Saved KB':>10}")
+        for category, stats in sorted(category_stats.items()):
+            avg_quality = stats['quality_sum'] / stats['images']
+            print(f"{category:<20} {stats['images']:>7} {avg_quality:>12.1f} {stats['saved'] / 1024:>10.1f}")
+
+def is_variant_file(path):
+    """Check whether a path is a generated responsive variant"""
+    return VARIANT_PATTERN.search(Path(path).name) is not None
+
+def variant_formats():
+    """Return the variant formats this Pillow build can encode (WebP, plus AVIF if available)"""
+    Image.init()
+    formats = ['webp']
+    if 'AVIF' in Image.SAVE:
+        formats.append('avif')
+    return formats
+
+def variant_path(image_path, width, fmt):
+    """Path of a variant, keeping the source extension so lion.jpg and lion.png don't collide"""
+    path = Path(image_path)
+    return path.with_name(f"{path.name}.{width}w.{fmt}")
+
+def load_data_image_paths(categories_file='categories.json'):
+    """Return every unique image path referenced by the category data files"""
+    with open(categories_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        categories = data.get('categories', data) if isinstance(data, dict) else data
+    
+    image_paths = []
+    seen = set()
+    for category in categories:
+        data_file = category.get('dataFile')
+        if not data_file or not os.path.exists(data_file):
+            continue
+        # Some data files were saved with a BOM by PowerShell
+        with open(data_file, 'r', encoding='utf-8-sig') as f:
+            items = json.load(f)
+        for item in items:
+            image_path = item.get('image')
+            if image_path and image_path not in seen:
+                seen.add(image_path)
+                image_paths.append(image_path)
+    return image_paths
+
+def generate_variants(image_path, widths=VARIANT_WIDTHS, formats=('webp',), force=False, target_ssim=None):
+    """
+    Write resized WebP/AVIF variants of one image next to it.
+    Widths larger than the source are capped at the source width (never upscaled).
+    Variants newer than the source are reused unless force is set.
+    With target_ssim, each variant's quality is searched instead of fixed.
+    """
+    try:
+        source_mtime = os.path.getmtime(image_path)
+        img, (source_width, source_height) = open_for_width(image_path, max(widths))
+        
+        # Never upscale: drop widths above the source and cap the largest at the source width
+        target_widths = sorted({min(w, source_width) for w in widths})
+        
+        variants = []
+        for width in target_widths:
+            height = max(1, round(source_height * width / source_width))
+            resized = None
+            for fmt in formats:
+                out_path = variant_path(image_path, width, fmt)
+                if force or not out_path.exists() or out_path.stat().st_mtime < source_mtime:
+                    if resized is None:
+                        resized = img if width == img.width else img.resize((width, height), Image.Resampling.LANCZOS,
+                                                                             reducing_gap=3.0)
+                    if target_ssim is not None:
+                        _, data = search_quality(resized, fmt, target_ssim)
+                        out_path.write_bytes(data)
+                    else:
+                        resized.save(out_path, fmt.upper(), quality=VARIANT_QUALITY.get(fmt, 80))
+                variants.append({
+                    'src': out_path.as_posix(),
+                    'format': fmt,
+                    'width': width,
+                    'height': height,
+                    'bytes': out_path.stat().st_size
+                })
+            if resized is not None and resized is not img:
+                resized.close()
+        
+        img.close()
+        
+        return {
+            'path': image_path,
+            'width': source_width,
+            'height': source_height,
+            'bytes': os.path.getsize(image_path),
+            'variants': variants,
+            'success': True
+        }
+    
+    except Exception as e:
+        return {
+            'path': image_path,
+            'success': False,
+            'error': str(e)
+        }
+
+def generate_all_variants(categories_file='categories.json', manifest_path=None,
+                          widths=VARIANT_WIDTHS, workers=1, force=False, target_ssim=None):
+    """
+    Generate responsive variants for every image used by the game and write
+    a manifest mapping each data/*.json image path to its variants and byte sizes.
+    """
+    image_paths = [p for p in load_data_image_paths(categories_file) if os.path.exists(p)]
+    formats = variant_formats()
+    if manifest_path is None:
+        manifest_path = os.path.join('images', VARIANT_MANIFEST)
+    
+    print(f"\nGenerating variants (widths={list(widths)}, formats={formats}, workers={workers})...")
+    print("-" * 70)
+    
+    generate = partial(generate_variants, widths=widths, formats=formats, force=force,
+                       target_ssim=target_ssim)
+    total_images = len(image_paths)
+    fallback_bytes = 0
+    smallest_bytes = 0
+    failed = 0
+    images = {}
+    
+    for i, result in enumerate(ordered_map(generate, image_paths, workers=workers), 1):
+        name = Path(result['path']).name
+        if not result['success']:
+            failed += 1
+            print(f"[{i}/{total_images}] {name}: FAILED - {result['error']}")
+            continue
+        
+        images[result['path']] = {
+            'width': result['width'],
+            'height': result['height'],
+            'bytes': result['bytes'],
+            'variants': result['variants']
+        }
+        smallest = min(v['bytes'] for v in result['variants'])
+        fallback_bytes += result['bytes']
+        smallest_bytes += smallest
+        print(f"[{i}/{total_images}] {name}: {len(result['variants'])} variants, "
+              f"{result['bytes'] / 1024:.1f} KB fallback -> {smallest / 1024:.1f} KB smallest")
+    
+    save_manifest(manifest_path, {
+        'widths': list(widths),
+        'formats': formats,
+        'images': images
+    })
+    
+    print("-" * 70)
+    print(f"Variants written for {len(images)} images ({failed} failed)")
+    print(f"Fallback total: {fallback_bytes / (1024 * 1024):.2f} MB")
+    print(f"Smallest-variant total: {smallest_bytes / (1024 * 1024):.2f} MB")
+    print(f"Manifest saved to: {manifest_path}")
 
 if __name__ == '__main__':
-    import sys
+    import argparse
     
     # Parse command line arguments
-    max_width = 800  # Default max width
-    quality = 85     # Default quality
+    parser = argparse.ArgumentParser(description="Compress and optimize game images in place")
+    parser.add_argument('max_width', nargs='?', type=int, default=800, help="Max width in pixels (default: 800)")
+    parser.add_argument('quality', nargs='?', type=int, default=85, help="JPEG quality (default: 85)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes (0 = one per CPU core, default: 1)")
+    parser.add_argument('--force', action='store_true',
+                        help="Re-optimize every image, ignoring the manifest")
+    parser.add_argument('--target-ssim', type=float, default=None,
+                        help="Search the smallest quality per image that reaches this SSIM (e.g. 0.97)")
+    parser.add_argument('--variants', action='store_true',
+                        help="Also write responsive WebP/AVIF variants and images/variants.json")
+    parser.add_argument('--widths', default=','.join(str(w) for w in VARIANT_WIDTHS),
+                        help="Comma-separated variant widths (default: 320,480,800)")
+    args = parser.parse_args()
     
-    if len(sys.argv) > 1:
-        max_width = int(sys.argv[1])
-    if len(sys.argv) > 2:
-        quality = int(sys.argv[2])
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
     
     print("=" * 70)
     print("IMAGE OPTIMIZATION TOOL")
     print("=" * 70)
-    print(f"Settings: Max Width = {max_width}px, Quality = {quality}%")
+    print(f"Settings: Max Width = {args.max_width}px, Quality = {args.quality}%, Workers = {workers}")
     print()
     
-    optimize_images_in_folder(max_width=max_width, quality=quality)
+    optimize_images_in_folder(max_width=args.max_width, quality=args.quality, workers=workers, force=args.force,
+                              target_ssim=args.target_ssim)
+    
+    if args.variants:
+        widths = tuple(int(w) for w in args.widths.split(',') if w.strip())
+        generate_all_variants(widths=widths, workers=workers, force=args.force, target_ssim=args.target_ssim)
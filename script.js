@@ -1,18 +1,131 @@
 // Load categories data from JSON file
 let categoriesData = {};
 let categoryMetadata = [];
-
-// Fetch categories metadata and prepare to load individual category data
-fetch('categories.json')
-    .then(response => response.json())
-    .then(data => {
-        categoryMetadata = data.categories;
-        console.log('Category metadata loaded:', categoryMetadata.length, 'categories');
+let imageCategory = {}; // image path -> category id, filled as category data arrives
+
+// One request for everything when build_data_bundle.py has been run,
+// otherwise categories.json now and each category's data file on demand
+fetch('data_bundle.json')
+    .then(response => {
+        if (!response.ok) throw new Error('no bundle');
+        return response.json();
+    })
+    .then(bundle => {
+        loadDataBundle(bundle);
+        console.log('Data bundle loaded:', categoryMetadata.length, 'categories');
+    })
+    .catch(() => fetch('categories.json')
+        .then(response => response.json())
+        .then(data => {
+            categoryMetadata = data.categories;
+            console.log('Category metadata loaded:', categoryMetadata.length, 'categories');
+        }))
+    .then(() => {
         // Dynamically generate category buttons
         renderCategoryButtons();
     })
     .catch(error => console.error('Error loading categories.json:', error));
 
+// Function to expand the interned bundle rows back into item objects
+function loadDataBundle(bundle) {
+    const fields = bundle.fields;
+    categoryMetadata = bundle.categories.map(category => {
+        const { items, ...metadata } = category;
+        categoriesData[metadata.id] = items.map(row => {
+            const item = { image: bundle.images[row[0]] };
+            for (let i = 1; i < row.length; i++) {
+                if (row[i] !== null) item[fields[i]] = row[i];
+            }
+            return item;
+        });
+        return metadata;
+    });
+    bundle.images.forEach((imagePath, index) => {
+        imageCategory[imagePath] = bundle.categories[bundle.imageCategory[index]].id;
+    });
+}
+
+// Responsive image variants generated by optimize_images.py --variants (optional)
+let imageVariants = {};
+const supportedVariantFormats = detectVariantFormats();
+
+fetch('images/variants.json')
+    .then(response => response.ok ? response.json() : { images: {} })
+    .then(data => {
+        imageVariants = data.images || {};
+        console.log('Image variants loaded:', Object.keys(imageVariants).length, 'images');
+    })
+    .catch(() => console.log('No image variants manifest, using original images'));
+
+// Instant-paint placeholders generated by generate_placeholders.py (optional)
+let imagePlaceholders = {};
+
+fetch('images/placeholders.json')
+    .then(response => response.ok ? response.json() : {})
+    .then(data => {
+        imagePlaceholders = data;
+        console.log('Image placeholders loaded:', Object.keys(imagePlaceholders).length, 'images');
+    })
+    .catch(() => console.log('No image placeholders, images will appear once loaded'));
+
+// Sprite atlases generated by build_atlases.py (optional)
+let atlasIndex = {};
+
+fetch('atlases/index.json')
+    .then(response => response.ok ? response.json() : { categories: {} })
+    .then(data => {
+        atlasIndex = data.categories || {};
+        console.log('Image atlases loaded:', Object.keys(atlasIndex).length, 'categories');
+    })
+    .catch(() => console.log('No image atlases, preloading images individually'));
+
+// Vector tagline cards generated by generate_tagline_images.py (optional)
+let vectorCards = {};
+
+fetch('images/taglines/cards.json')
+    .then(response => response.ok ? response.json() : { cards: {} })
+    .then(data => {
+        vectorCards = data.cards || {};
+        console.log('Vector cards loaded:', Object.keys(vectorCards).length, 'cards');
+    })
+    .catch(() => console.log('No vector cards, using JPEG tagline cards'));
+
+// Function to detect which variant formats the browser can display
+function detectVariantFormats() {
+    const formats = [];
+    const canvas = document.createElement('canvas');
+    canvas.width = canvas.height = 1;
+    if (canvas.toDataURL('image/webp').startsWith('data:image/webp')) {
+        formats.push('webp');
+    }
+    return formats;
+}
+
+// Function to pick the smallest variant that is at least as wide as the picture area
+function resolveImageSrc(imagePath) {
+    // Vector cards are inline SVG, so they need no request at all
+    const card = vectorCards[imagePath];
+    if (card) return 'data:image/svg+xml;charset=utf-8,' + encodeURIComponent(card.svg);
+    
+    const entry = imageVariants[imagePath];
+    if (!entry || !entry.variants) return imagePath;
+    
+    const pictureArea = document.getElementById('picture-area');
+    const displayWidth = (pictureArea && pictureArea.clientWidth) || window.innerWidth;
+    const targetWidth = Math.min(displayWidth * (window.devicePixelRatio || 1), entry.width);
+    
+    let best = null;
+    entry.variants.forEach(variant => {
+        if (!supportedVariantFormats.includes(variant.format) || variant.width < targetWidth) return;
+        if (!best || variant.bytes < best.bytes) {
+            best = variant;
+        }
+    });
+    
+    // Fall back to the original JPEG if no supported variant is large enough
+    return best && best.bytes < entry.bytes ? best.src : imagePath;
+}
+
 // Function to dynamically render category buttons
 function renderCategoryButtons() {
     const categoriesContainer = document.querySelector('.categories');
@@ -60,6 +173,9 @@ async function loadCategoryData(categoryId) {
         const response = await fetch(category.dataFile);
         const data = await response.json();
         categoriesData[categoryId] = data;
+        data.forEach(item => {
+            if (!(item.image in imageCategory)) imageCategory[item.image] = categoryId;
+        });
         console.log(`Loaded ${categoryId} category:`, data.length, 'items');
         return data;
     } catch (error) {
@@ -76,6 +192,7 @@ const loadingIndicator = document.getElementById('loading-indicator');
 
 // Category buttons are dynamically generated
 const gameImage = document.getElementById('game-image');
+const gameCanvas = document.getElementById('game-canvas'); // Atlas crops are drawn here
 const itemNameDisplay = document.getElementById('item-name');
 const instructionsText = document.getElementById('instructions');
 const timerDisplay = document.getElementById('timer');
@@ -98,6 +215,7 @@ let gamePhase = 0; // 0: initial (tap for picture), 1: picture shown (tap for na
 let tappedOnce = false; // To ensure only one tap per phase transition
 let autoAdvanceTimer; // Timer for auto-advancing to next item
 let imageCache = {}; // Cache for preloaded images
+let pictureElement = gameImage; // gameImage or gameCanvas, whichever shows the current item
 let isPreloading = false; // Flag to track if images are being preloaded
 let gameMode = localStorage.getItem('gameMode') || 'standard'; // Game mode: 'standard' or 'catchphrase'
 
@@ -119,22 +237,80 @@ async function preloadCategoryImages(categoryName) {
         imageCache[categoryName] = {};
     }
     
-    // Preload images asynchronously
+    // Preload images asynchronously, a few atlas sheets first if available
+    const atlasItems = preloadCategoryAtlases(categoryName);
     category.forEach((item) => {
-        if (!imageCache[categoryName][item.image]) {
+        if (!imageCache[categoryName][item.image] && !atlasItems[item.image]) {
             const img = new Image();
-            img.src = item.image;
+            img.src = resolveImageSrc(item.image);
             // Store the image in cache once it's loaded
             img.onload = () => {
                 imageCache[categoryName][item.image] = img;
             };
             img.onerror = () => {
+                if (img.src.startsWith('data:image/svg')) {
+                    // SVG could not be drawn, fall back to the raster card
+                    img.src = item.image;
+                    return;
+                }
                 console.warn(`Failed to preload image: ${item.image}`);
             };
         }
     });
 }
 
+function cacheCategoryOffline(categoryName) {
+    // Ask the service worker to keep the whole category for offline play
+    if (!('serviceWorker' in navigator)) return;
+    navigator.serviceWorker.ready
+        .then(registration => registration.active.postMessage({ type: 'cache-category', category: categoryName }))
+        .catch(error => console.warn('Offline caching failed:', error));
+}
+
+function preloadCategoryAtlases(categoryName) {
+    // Load the category's atlas sheets; each item is later drawn straight from its decoded sheet.
+    // Vector cards need no download and width variants are already sized for the screen, so
+    // atlases are only used for the items that have neither
+    const entry = atlasIndex[categoryName];
+    if (!entry) return {};
+    const items = {};
+    Object.entries(entry.items).forEach(([imagePath, rect]) => {
+        if (vectorCards[imagePath] || imageVariants[imagePath]) return;
+        items[imagePath] = rect;
+    });
+    
+    entry.atlases.forEach((atlas, atlasNumber) => {
+        const sheetItems = Object.entries(items).filter(([, rect]) => rect.atlas === atlasNumber);
+        if (sheetItems.length === 0) return;
+        const sheet = new Image();
+        sheet.src = atlas.src;
+        sheet.onload = () => {
+            sheetItems.forEach(([imagePath, rect]) => {
+                if (!imageCache[categoryName][imagePath]) {
+                    imageCache[categoryName][imagePath] = { sheet, rect };
+                }
+            });
+        };
+        sheet.onerror = () => {
+            console.warn(`Failed to preload atlas: ${atlas.src}`);
+        };
+    });
+    return items;
+}
+
+function showPicture() {
+    pictureElement.style.display = 'block';
+    pictureElement.style.opacity = 1;
+}
+
+function hidePicture() {
+    // Hides both, so switching between the image and the atlas canvas never shows a stale picture
+    [gameImage, gameCanvas].forEach(element => {
+        element.style.opacity = 0;
+        element.style.display = 'none';
+    });
+}
+
 function getPreloadedImage(categoryName, imagePath) {
     // Get a preloaded image from cache or return null if not yet loaded
     if (imageCache[categoryName] && imageCache[categoryName][imagePath]) {
@@ -171,6 +347,7 @@ async function startGame(categoryName) {
     
     // Start preloading images immediately in background
     preloadCategoryImages(categoryName);
+    cacheCategoryOffline(categoryName);
     
     currentCategory = [...categoryData]; // Copy to allow shuffling
     shuffleArray(currentCategory);
@@ -182,7 +359,7 @@ async function startGame(categoryName) {
     timerDisplay.textContent = timeLeft;
     
     // Ensure image is completely hidden before starting
-    gameImage.style.opacity = 0;
+    hidePicture();
     gameImage.src = '';
     
     // Ensure name is hidden immediately (use display:none via .hidden) to avoid any brief flash
@@ -211,22 +388,43 @@ function loadNextItem() {
     }
     
     // Hide the image immediately without animation
-    gameImage.style.opacity = 0;
-    gameImage.style.display = 'none';
+    hidePicture();
     
     const item = currentCategory[currentIndex];
     
-    // Get the current category name from the shuffled array
-    const categoryName = Object.keys(categoriesData).find(cat => 
-        categoriesData[cat].some(i => i.image === item.image)
-    );
+    // Look up the item's category by image path
+    const categoryName = imageCategory[item.image];
     
     // Try to use preloaded image, otherwise set src to load it
     const preloadedImg = getPreloadedImage(categoryName, item.image);
-    if (preloadedImg) {
+    const placeholder = imagePlaceholders[item.image];
+    gameImage.style.backgroundColor = placeholder ? placeholder.color : '';
+    pictureElement = preloadedImg && preloadedImg.sheet ? gameCanvas : gameImage;
+    if (preloadedImg && preloadedImg.sheet) {
+        // Atlas crop: copy the pixels from the decoded sheet, no re-encoding
+        const rect = preloadedImg.rect;
+        gameCanvas.width = rect.w;
+        gameCanvas.height = rect.h;
+        gameCanvas.getContext('2d').drawImage(preloadedImg.sheet, rect.x, rect.y, rect.w, rect.h,
+                                              0, 0, rect.w, rect.h);
+    } else if (preloadedImg) {
         gameImage.src = preloadedImg.src;
+    } else if (placeholder) {
+        // Paint the blurred preview now and swap in the full image once it arrives
+        gameImage.src = placeholder.lqip;
+        const fullImg = new Image();
+        fullImg.onload = () => {
+            if (currentCategory[currentIndex] === item) {
+                gameImage.src = fullImg.src;
+            }
+        };
+        fullImg.src = resolveImageSrc(item.image);
     } else {
-        gameImage.src = item.image;
+        gameImage.onerror = vectorCards[item.image] ? () => {
+            gameImage.onerror = null;
+            gameImage.src = item.image;
+        } : null;
+        gameImage.src = resolveImageSrc(item.image);
     }
     
     // Set the name while it's hidden so it never appears briefly on load
@@ -250,8 +448,7 @@ function loadNextItem() {
         
         // Show both image and name immediately
         setTimeout(() => {
-            gameImage.style.display = 'block';
-            gameImage.style.opacity = 1;
+            showPicture();
             itemNameDisplay.classList.remove('hidden');
             requestAnimationFrame(() => {
                 itemNameDisplay.style.opacity = 1;
@@ -267,8 +464,7 @@ function loadNextItem() {
         // Auto-show the picture after a brief delay (500ms) to give smooth transition
         setTimeout(() => {
             if (gamePhase === 0) { // Only auto-show if still in phase 0
-                gameImage.style.display = 'block';
-                gameImage.style.opacity = 1;
+                showPicture();
                 instructionsText.textContent = 'Tap again to reveal name!';
                 gamePhase = 1;
                 tappedOnce = false;
@@ -290,8 +486,7 @@ function handleTap() {
         tappedOnce = true;
 
         if (gamePhase === 0) { // First tap: show picture
-            gameImage.style.display = 'block';
-            gameImage.style.opacity = 1;
+            showPicture();
             instructionsText.textContent = 'Tap again to reveal name!';
             gamePhase = 1;
             tappedOnce = false; // Reset for next phase
@@ -442,7 +637,7 @@ function exitGame() {
     stopMusic();
 
     // Reset visuals/state so when player returns later there's no leftover name/image
-    gameImage.style.opacity = 0;
+    hidePicture();
     itemNameDisplay.classList.add('hidden');
     itemNameDisplay.style.opacity = 0;
     itemNameDisplay.textContent = '';
@@ -496,12 +691,33 @@ timeButtons.forEach(button => {
     });
 });
 
-// Preload sounds (optional, but good for smoother play)
-bgMusic.load();
-revealPictureSound.load();
-revealNameSound.load();
-correctSound.load();
-timerEndSound.load();
+// Offline support generated by generate_service_worker.py (optional)
+if ('serviceWorker' in navigator && location.protocol !== 'file:') {
+    navigator.serviceWorker.register('sw.js')
+        .catch(error => console.log('No service worker, offline play unavailable:', error));
+}
+
+// Preload sounds (optional, but good for smoother play), switching to the
+// smallest playable variant from optimize_audio.py when there is a manifest
+const gameSounds = [bgMusic, revealPictureSound, revealNameSound, correctSound, timerEndSound];
+
+fetch('sounds/audio.json')
+    .then(response => response.ok ? response.json() : { sounds: {} })
+    .catch(() => ({ sounds: {} }))
+    .then(data => {
+        const sounds = data.sounds || {};
+        gameSounds.forEach(audio => {
+            if (!audio.paused) return; // Already started by an early tap
+            const entry = sounds[audio.getAttribute('src')];
+            const variant = entry && entry.variants.find(v => audio.canPlayType(v.type));
+            if (variant) {
+                audio.src = variant.src;
+            }
+            audio.preload = 'auto';
+            audio.load();
+        });
+        console.log('Audio variants loaded:', Object.keys(sounds).length, 'sounds');
+    });
 
 // Ensure audio is not muted and set initial volume
 bgMusic.muted = false;
@@ -6,71 +6,295 @@ Runs completely offline after initial model download.
 
 import json
 import os
+import random
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import time
 from difflib import SequenceMatcher
 
-# Try to import required libraries
-try:
-    from PIL import Image
-    from transformers import BlipProcessor, BlipForConditionalGeneration, BlipForQuestionAnswering
+_START = time.perf_counter()
+
+# torch and transformers are imported when a model is first needed, so listing
+# categories or scoring cached answers starts instantly
+from PIL import Image
+
+from find_duplicate_images import find_duplicate_pairs
+from optimize_images import file_hash, load_manifest, peak_rss_mb, save_manifest
+
+CAPTION_MODEL = "Salesforce/blip-image-captioning-base"
+VQA_MODEL = "Salesforce/blip-vqa-base"
+CACHE_FILE = '.verification_cache.json'
+RESULTS_LOG = 'image_verification_results.jsonl'
+
+# Inference backends: full-precision PyTorch, dynamic int8 PyTorch, ONNX Runtime vision encoders
+BACKENDS = ('fp32', 'int8', 'onnx')
+ONNX_DIR = '.onnx_models'
+
+# Cascade mode runs the cheap VQA questions first; the long caption only for still-undecided images
+CASCADE_STAGES = ('yes_no', 'answer', 'caption')
+
+# Which models a verifier uses, and the most each answer can add to the score
+MODEL_MODES = ('both', 'caption', 'vqa')
+MAX_SCORE = {'caption': 0.6, 'answer': 0.5, 'yes_no': 0.3}
+
+
+def _quantize_int8(model):
+    """Dynamically quantize every Linear layer to int8 (CPU only)."""
     import torch
-except ImportError:
-    print("Required libraries not installed. Installing...")
-    print("This may take a few minutes...")
-    import subprocess
-    subprocess.check_call(["pip", "install", "transformers", "torch", "torchvision", "pillow"])
-    from PIL import Image
-    from transformers import BlipProcessor, BlipForConditionalGeneration, BlipForQuestionAnswering
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _onnx_vision_encoder(vision_model, model_name: str):
+    """
+    Wrap a BLIP vision encoder in an ONNX Runtime session, exporting it to
+    ONNX_DIR on first use. The text decoder keeps running in PyTorch.
+    """
+    import onnxruntime as ort
     import torch
+    
+    onnx_path = os.path.join(ONNX_DIR, model_name.replace('/', '--') + '-vision.onnx')
+    if not os.path.exists(onnx_path):
+        print(f"Exporting {model_name} vision encoder to {onnx_path}...")
+        os.makedirs(ONNX_DIR, exist_ok=True)
+        
+        class VisionExport(torch.nn.Module):
+            def __init__(self, encoder):
+                super().__init__()
+                self.encoder = encoder
+            
+            def forward(self, pixel_values):
+                return self.encoder(pixel_values=pixel_values)[0]
+        
+        size = vision_model.config.image_size
+        # Pool workers may export at the same time on a cold cache; each writes its
+        # own file and the atomic rename below lets the last complete one win
+        tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+        torch.onnx.export(VisionExport(vision_model).eval(), (torch.zeros(1, 3, size, size),), tmp_path,
+                          input_names=['pixel_values'], output_names=['last_hidden_state'],
+                          dynamic_axes={'pixel_values': {0: 'batch'}, 'last_hidden_state': {0: 'batch'}},
+                          opset_version=17)
+        os.replace(tmp_path, onnx_path)
+    
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = torch.get_num_threads()
+    session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+    
+    class OnnxVisionEncoder(torch.nn.Module):
+        """Drop-in for BlipVisionModel inside generate(), which only reads output[0]."""
+        
+        def forward(self, pixel_values=None, **kwargs):
+            hidden = session.run(None, {'pixel_values': pixel_values.cpu().numpy()})[0]
+            return (torch.from_numpy(hidden),)
+    
+    return OnnxVisionEncoder()
 
 
 class LocalImageVerifier:
     """Local AI-based image verifier using BLIP model (free, no API key needed)."""
     
-    def __init__(self):
-        """Initialize the BLIP model for image captioning and VQA."""
-        print("Loading AI models (this may take a minute on first run)...")
-        print("Models will be cached for future use...")
-        
-        # Use BLIP for image captioning
-        self.caption_processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-        self.caption_model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+    def __init__(self, load_models: bool = True, backend: str = 'fp32', models: str = 'both'):
+        """
+        Set up the BLIP verifier; each model is loaded the first time it is needed.
         
-        # Use BLIP for visual question answering
-        self.vqa_processor = BlipProcessor.from_pretrained("Salesforce/blip-vqa-base")
-        self.vqa_model = BlipForQuestionAnswering.from_pretrained("Salesforce/blip-vqa-base")
+        Args:
+            load_models: False gives a scoring-only instance that never loads models
+            backend: 'fp32' (PyTorch), 'int8' (dynamically quantized PyTorch) or 'onnx' (ONNX Runtime)
+            models: 'both', 'caption' (captioning model only) or 'vqa' (question answering model only)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+        if models not in MODEL_MODES:
+            raise ValueError(f"Unknown models '{models}' (expected one of {', '.join(MODEL_MODES)})")
+        self.backend = backend
+        self.models = models
+        self.load_models = load_models
         
-        # Determine device
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.caption_model.to(self.device)
-        self.vqa_model.to(self.device)
+        # Seconds spent per stage (model loads, preprocess, caption, vqa)
+        self.timings = {}
+        self._timings_lock = threading.Lock()
         
-        print(f"[OK] Models loaded successfully! (Using {self.device.upper()})")
-        print()
+        self._device = None
+        self._caption_processor = None
+        self._caption_model = None
+        self._vqa_processor = None
+        self._vqa_model = None
+        self._shared_pixels = None
+        # Processors are first used from the prefetch threads
+        self._processor_lock = threading.Lock()
     
-    def get_image_caption(self, image_path: str) -> str:
-        """Generate a caption for the image."""
+    @contextmanager
+    def _timed(self, stage: str):
+        """Add the time spent in the block to self.timings[stage]."""
+        start = time.perf_counter()
         try:
-            image = Image.open(image_path).convert('RGB')
-            inputs = self.caption_processor(image, return_tensors="pt").to(self.device)
-            out = self.caption_model.generate(**inputs, max_length=50)
-            caption = self.caption_processor.decode(out[0], skip_special_tokens=True)
-            return caption
-        except Exception as e:
-            return f"Error: {str(e)}"
+            yield
+        finally:
+            with self._timings_lock:
+                self.timings[stage] = self.timings.get(stage, 0.0) + time.perf_counter() - start
     
-    def ask_question(self, image_path: str, question: str) -> str:
-        """Ask a question about the image."""
-        try:
-            image = Image.open(image_path).convert('RGB')
-            inputs = self.vqa_processor(image, question, return_tensors="pt").to(self.device)
-            out = self.vqa_model.generate(**inputs, max_length=20)
-            answer = self.vqa_processor.decode(out[0], skip_special_tokens=True)
-            return answer
-        except Exception as e:
-            return f"Error: {str(e)}"
+    def _load_model(self, model_name: str, stage: str):
+        """Load one BLIP model, applying the backend's conversion."""
+        if not self.load_models:
+            raise RuntimeError("This verifier is scoring-only and has no models")
+        print(f"Loading {model_name} (this may take a minute on first run)...")
+        with self._timed(stage):
+            from transformers import BlipForConditionalGeneration, BlipForQuestionAnswering
+            model_class = BlipForConditionalGeneration if model_name == CAPTION_MODEL else BlipForQuestionAnswering
+            model = model_class.from_pretrained(model_name)
+            model.to(self.device)
+            
+            if self.backend == 'int8':
+                model = _quantize_int8(model)
+            elif self.backend == 'onnx':
+                model.vision_model = _onnx_vision_encoder(model.vision_model, model_name)
+        print(f"[OK] Loaded in {self.timings[stage]:.1f}s (Using {self.device.upper()}, {self.backend} backend)")
+        return model
+    
+    def _load_processor(self, model_name: str):
+        """Load a BLIP processor (tokenizer and image preprocessing only, no weights)."""
+        with self._timed('load_processors'):
+            from transformers import BlipProcessor
+            return BlipProcessor.from_pretrained(model_name)
+    
+    @property
+    def device(self) -> str:
+        """'cuda' when available for fp32, otherwise 'cpu' (quantized and ONNX backends are CPU only)."""
+        if self._device is None:
+            import torch
+            self._device = "cuda" if torch.cuda.is_available() and self.backend == 'fp32' else "cpu"
+        return self._device
+    
+    @property
+    def caption_processor(self):
+        if self._caption_processor is None:
+            with self._processor_lock:
+                if self._caption_processor is None:
+                    self._caption_processor = self._load_processor(CAPTION_MODEL)
+        return self._caption_processor
+    
+    @property
+    def caption_model(self):
+        if self._caption_model is None:
+            self._caption_model = self._load_model(CAPTION_MODEL, 'load_caption_model')
+        return self._caption_model
+    
+    @property
+    def vqa_processor(self):
+        if self._vqa_processor is None:
+            with self._processor_lock:
+                if self._vqa_processor is None:
+                    self._vqa_processor = self._load_processor(VQA_MODEL)
+        return self._vqa_processor
+    
+    @property
+    def vqa_model(self):
+        if self._vqa_model is None:
+            self._vqa_model = self._load_model(VQA_MODEL, 'load_vqa_model')
+        return self._vqa_model
+    
+    @property
+    def shared_pixels(self) -> bool:
+        """
+        Both BLIP checkpoints normally ship the same image preprocessing config;
+        when they do, each image is resized/normalized once and shared by both models.
+        """
+        if self._shared_pixels is None:
+            self._shared_pixels = (self.models == 'both' and self.caption_processor.image_processor.to_dict()
+                                   == self.vqa_processor.image_processor.to_dict())
+        return self._shared_pixels
+    
+    def load(self):
+        """Load the selected models now rather than on first use."""
+        attributes = []
+        if self.models != 'vqa':
+            attributes += ['caption_processor', 'caption_model']
+        if self.models != 'caption':
+            attributes += ['vqa_processor', 'vqa_model']
+        for attribute in attributes:
+            getattr(self, attribute)
+    
+    def get_image_captions(self, pixel_values) -> List[str]:
+        """Generate captions for a batch of preprocessed images in one generate call."""
+        model = self.caption_model
+        with self._timed('caption'):
+            out = model.generate(pixel_values=pixel_values.to(self.device), max_length=50)
+            return self.caption_processor.batch_decode(out, skip_special_tokens=True)
+    
+    def ask_questions(self, pixel_values, questions: List[str]) -> List[str]:
+        """Ask one question per image for a batch of preprocessed images in one generate call."""
+        model = self.vqa_model
+        with self._timed('vqa'):
+            text_inputs = self.vqa_processor.tokenizer(questions, padding=True, return_tensors="pt").to(self.device)
+            out = model.generate(pixel_values=pixel_values.to(self.device), max_length=20, **text_inputs)
+            return self.vqa_processor.batch_decode(out, skip_special_tokens=True)
+    
+    def preprocess_batch(self, items: List[Tuple[str, str, str]]) -> Dict:
+        """
+        Decode each image once and build the pixel tensors for the models in use.
+        
+        Returns:
+            Dict with 'indexes' (items that decoded), 'errors' (index -> message),
+            and 'caption_pixels'/'vqa_pixels' (the same tensor when configs match,
+            None for a model that is not used)
+        """
+        with self._timed('preprocess'):
+            return self._preprocess_batch(items)
+    
+    def _preprocess_batch(self, items: List[Tuple[str, str, str]]) -> Dict:
+        images = []
+        indexes = []
+        errors = {}
+        
+        # A broken file only fails its own item
+        for i, (image_path, expected_item, category) in enumerate(items):
+            try:
+                with Image.open(image_path) as img:
+                    images.append(img.convert('RGB'))
+                indexes.append(i)
+            except Exception as e:
+                errors[i] = str(e)
+        
+        caption_pixels = vqa_pixels = None
+        if images:
+            if self.models != 'vqa':
+                caption_pixels = self.caption_processor.image_processor(images, return_tensors="pt")['pixel_values']
+            if self.shared_pixels:
+                vqa_pixels = caption_pixels
+            elif self.models != 'caption':
+                vqa_pixels = self.vqa_processor.image_processor(images, return_tensors="pt")['pixel_values']
+        
+        return {
+            'indexes': indexes,
+            'errors': errors,
+            'caption_pixels': caption_pixels,
+            'vqa_pixels': vqa_pixels
+        }
+    
+    def prefetch_batches(self, batches: Iterable[List[Tuple[str, str, str]]],
+                         prefetch: int = 2) -> Iterator[Tuple[List[Tuple[str, str, str]], Dict]]:
+        """
+        Yield (batch, preprocessed) pairs, decoding and preprocessing upcoming
+        batches on background threads while the models work on the current one.
+        """
+        batch_iter = iter(batches)
+        with ThreadPoolExecutor(max_workers=max(1, prefetch)) as pool:
+            pending = deque()
+            for _ in range(max(1, prefetch)):
+                batch = next(batch_iter, None)
+                if batch is None:
+                    break
+                pending.append((batch, pool.submit(self.preprocess_batch, batch)))
+            
+            while pending:
+                batch, future = pending.popleft()
+                next_batch = next(batch_iter, None)
+                if next_batch is not None:
+                    pending.append((next_batch, pool.submit(self.preprocess_batch, next_batch)))
+                yield batch, future.result()
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate similarity between two strings."""
@@ -80,20 +304,209 @@ class LocalImageVerifier:
         """
         Verify if an image matches the expected item.
         
+        Returns:
+            Tuple of (is_correct, explanation, confidence_score)
+        """
+        # Decode and preprocess once for the caption and both questions
+        return self.verify_batch([(image_path, expected_item, category)])[0]
+    
+    def verify_batch(self, items: List[Tuple[str, str, str]], preprocessed: Optional[Dict] = None,
+                     cascade: bool = False) -> List[Tuple[bool, str, float]]:
+        """
+        Verify a batch of images with one caption pass and two batched VQA passes.
+        
+        Args:
+            items: List of tuples (image_path, expected_item, category)
+            preprocessed: Output of preprocess_batch(items), if already computed
+            cascade: Skip later passes for images whose verdict is already settled
+        
+        Returns:
+            List of (is_correct, explanation, confidence_score), in the same order as items
+        """
+        answers = self.answer_batch(items, preprocessed, cascade)
+        return [self.score_result(item[1], answer) for item, answer in zip(items, answers)]
+    
+    def answer_batch(self, items: List[Tuple[str, str, str]],
+                     preprocessed: Optional[Dict] = None, cascade: bool = False) -> List[Dict]:
+        """
+        Run the caption and both VQA questions for a batch of images (only the
+        passes of the models in use; the others' answers are None).
+        
+        With cascade, stages run in CASCADE_STAGES order and each image stops as soon as
+        its verdict can no longer change; skipped answers are None and 'exit_stage'
+        names the last stage run.
+        
+        Returns:
+            List of dicts with 'caption', 'answer' and 'yes_no' (or 'error'), in item order
+        """
+        results = [None] * len(items)
+        try:
+            if preprocessed is None:
+                preprocessed = self.preprocess_batch(items)
+        except Exception as e:
+            return [{'error': str(e)} for _ in items]
+        
+        for i, error in preprocessed['errors'].items():
+            results[i] = {'error': error}
+        
+        batch_indexes = preprocessed['indexes']
+        if not batch_indexes:
+            return results
+        
+        if cascade:
+            if self.models != 'both':
+                raise ValueError("Cascade mode needs both the caption and VQA models")
+            return self._answer_cascade(items, preprocessed, results)
+        
+        try:
+            captions = answers1 = answers2 = [None] * len(batch_indexes)
+            if self.models != 'vqa':
+                captions = self.get_image_captions(preprocessed['caption_pixels'])
+            if self.models != 'caption':
+                answers1 = self.ask_questions(preprocessed['vqa_pixels'], ["What is this?"] * len(batch_indexes))
+                answers2 = self.ask_questions(preprocessed['vqa_pixels'],
+                                              [f"Is this a {items[i][1]}?" for i in batch_indexes])
+        except Exception as e:
+            for i in batch_indexes:
+                results[i] = {'error': str(e)}
+            return results
+        
+        for i, caption, a1, a2 in zip(batch_indexes, captions, answers1, answers2):
+            results[i] = {'caption': caption, 'answer': a1, 'yes_no': a2}
+        return results
+    
+    def _answer_cascade(self, items: List[Tuple[str, str, str]], preprocessed: Dict,
+                        results: List[Optional[Dict]]) -> List[Dict]:
+        """Run the cascade stages, each only on the images whose verdict is still open."""
+        batch_indexes = preprocessed['indexes']
+        for i in batch_indexes:
+            results[i] = {'caption': None, 'answer': None, 'yes_no': None}
+        
+        active = list(range(len(batch_indexes)))
+        try:
+            for stage in CASCADE_STAGES:
+                if not active:
+                    break
+                pixels = preprocessed['caption_pixels' if stage == 'caption' else 'vqa_pixels']
+                if len(active) < len(batch_indexes):
+                    pixels = pixels[active]
+                
+                if stage == 'caption':
+                    outputs = self.get_image_captions(pixels)
+                elif stage == 'answer':
+                    outputs = self.ask_questions(pixels, ["What is this?"] * len(active))
+                else:
+                    outputs = self.ask_questions(pixels, [f"Is this a {items[batch_indexes[row]][1]}?"
+                                                          for row in active])
+                
+                still_open = []
+                for row, output in zip(active, outputs):
+                    answers = results[batch_indexes[row]]
+                    answers[stage] = output
+                    answers['exit_stage'] = stage
+                    low, high = self.score_bounds(items[batch_indexes[row]][1], answers['caption'],
+                                                  answers['answer'], answers['yes_no'])
+                    if high >= 0.5 and low < 0.5:
+                        still_open.append(row)
+                active = still_open
+        except Exception as e:
+            for i in batch_indexes:
+                results[i] = {'error': str(e)}
+        return results
+    
+    def score_result(self, expected_item: str, answers: Dict) -> Tuple[bool, str, float]:
+        """Score one answer_batch result (errors score as incorrect with 0 confidence)."""
+        if 'error' in answers:
+            return False, f"Error: {answers['error']}", 0.0
+        if None in (answers['caption'], answers['answer'], answers['yes_no']):
+            if 'exit_stage' in answers:
+                return self.score_partial(expected_item, answers)
+            return self.score_single_model(expected_item, answers)
+        return self.score_answers(expected_item, answers['caption'], answers['answer'], answers['yes_no'])
+    
+    def score_bounds(self, expected_item: str, caption: Optional[str], a1: Optional[str],
+                     a2: Optional[str]) -> Tuple[float, float]:
+        """
+        Lowest and highest score_answers() score still reachable when some answers
+        are missing (None), using the same weights.
+        """
+        low = high = 0.0
+        expected = expected_item.lower()
+        
+        # Caption and "What is this?": up to 0.4 / 0.3 for containing the name, plus 0.2 * similarity
+        for text, contains_weight in ((caption, 0.4), (a1, 0.3)):
+            if text is None:
+                high += contains_weight + 0.2
+                continue
+            value = self.calculate_similarity(text, expected_item) * 0.2
+            if expected in text.lower():
+                value += contains_weight
+            low += value
+            high += value
+        
+        # Yes/No question: +0.3 for yes, -0.3 for no
+        if a2 is None:
+            low -= 0.3
+            high += 0.3
+        else:
+            yes_no_answer = a2.lower()
+            if any(word in yes_no_answer for word in ['yes', 'yeah', 'correct', 'true']):
+                low += 0.3
+                high += 0.3
+            elif any(word in yes_no_answer for word in ['no', 'not', 'incorrect', 'false']):
+                low -= 0.3
+                high -= 0.3
+        
+        return low, high
+    
+    def score_partial(self, expected_item: str, answers: Dict) -> Tuple[bool, str, float]:
+        """
+        Score a cascade result whose verdict was settled before every stage ran.
+        Confidence is the score of the answers actually asked.
+        """
+        caption, a1, a2 = answers['caption'], answers['answer'], answers['yes_no']
+        low, high = self.score_bounds(expected_item, caption, a1, a2)
+        is_correct = low >= 0.5
+        asked_score = self.score_bounds(expected_item, caption or '', a1 or '', a2 or '')[0]
+        confidence = min(max(asked_score, 0.0), 1.0)
+        
+        explanation = self._explain(expected_item, answers) + f"(decided after {answers['exit_stage']} stage)"
+        return is_correct, explanation, confidence
+    
+    def score_single_model(self, expected_item: str, answers: Dict) -> Tuple[bool, str, float]:
+        """
+        Score a --caption-only or --vqa-only result: the asked answers' score is scaled
+        up by the share of MAX_SCORE they cover, then compared to the usual 0.5 threshold.
+        """
+        caption, a1, a2 = answers['caption'], answers['answer'], answers['yes_no']
+        asked_score = self.score_bounds(expected_item, caption or '', a1 or '', a2 or '')[0]
+        asked_max = sum(MAX_SCORE[key] for key in MAX_SCORE if answers[key] is not None)
+        score = asked_score * sum(MAX_SCORE.values()) / asked_max
+        
+        model = 'caption' if caption is not None else 'VQA'
+        explanation = self._explain(expected_item, answers) + f"({model} model only)"
+        return score >= 0.5, explanation, min(max(score, 0.0), 1.0)
+    
+    def _explain(self, expected_item: str, answers: Dict) -> str:
+        """Explanation text for the answers that were asked."""
+        caption, a1, a2 = answers['caption'], answers['answer'], answers['yes_no']
+        explanation = ""
+        if caption is not None:
+            explanation += f"Caption: '{caption}'. "
+        if a1 and "error" not in a1.lower():
+            explanation += f"AI identifies this as: '{a1}'. "
+        if a2 and "error" not in a2.lower():
+            explanation += f"Is it a {expected_item}? {a2}. "
+        return explanation
+    
+    def score_answers(self, expected_item: str, caption: str, a1: str, a2: str) -> Tuple[bool, str, float]:
+        """
+        Score a caption and the two VQA answers against the expected item.
+        
         Returns:
             Tuple of (is_correct, explanation, confidence_score)
         """
         try:
-            # Get image caption
-            caption = self.get_image_caption(image_path)
-            
-            # Ask specific questions
-            q1 = f"What is this?"
-            a1 = self.ask_question(image_path, q1)
-            
-            q2 = f"Is this a {expected_item}?"
-            a2 = self.ask_question(image_path, q2)
-            
             # Calculate similarities
             caption_similarity = self.calculate_similarity(caption, expected_item)
             answer_similarity = self.calculate_similarity(a1, expected_item)
@@ -143,14 +556,51 @@ class LocalImageVerifier:
 _verifier = None
 
 
-def get_verifier():
+def get_verifier(backend: str = 'fp32', models: str = 'both'):
     """Get or create the global verifier instance."""
     global _verifier
-    if _verifier is None:
-        _verifier = LocalImageVerifier()
+    if _verifier is None or (_verifier.backend, _verifier.models) != (backend, models):
+        _verifier = LocalImageVerifier(backend=backend, models=models)
     return _verifier
 
 
+def set_torch_threads(num_threads: int):
+    """Limit torch's intra-op threads (imports torch)."""
+    import torch
+    torch.set_num_threads(num_threads)
+
+
+# Per-process verifier used by --workers pool processes
+_worker_verifier = None
+
+
+def _init_worker(num_threads: Optional[int], backend: str = 'fp32', models: str = 'both'):
+    """Process-pool initializer: set this worker's torch thread budget and load the models once."""
+    global _worker_verifier
+    if num_threads:
+        set_torch_threads(num_threads)
+    _worker_verifier = LocalImageVerifier(backend=backend, models=models)
+    _worker_verifier.load()
+
+
+def _answer_batch_in_worker(batch: List[Tuple[str, str, str]], throttle: float = 0.0,
+                            cascade: bool = False) -> Tuple[List[Dict], Dict[str, float]]:
+    """Process-pool task: run the models on one batch in this worker, returning its answers and stage timings."""
+    before = dict(_worker_verifier.timings)
+    answers = _worker_verifier.answer_batch(batch, cascade=cascade)
+    if throttle > 0:
+        time.sleep(throttle)
+    # The first batch also reports this worker's model load times
+    timings = {stage: seconds - before.get(stage, 0.0) for stage, seconds in _worker_verifier.timings.items()}
+    return answers, timings
+
+
+def add_timings(total: Dict[str, float], timings: Dict[str, float]):
+    """Accumulate per-stage seconds into total."""
+    for stage, seconds in timings.items():
+        total[stage] = total.get(stage, 0.0) + seconds
+
+
 def verify_image_with_ai(verifier, image_path: str, expected_item: str, category: str) -> Tuple[bool, str, float]:
     """
     Verify if an image matches the expected item using local AI.
@@ -161,36 +611,166 @@ def verify_image_with_ai(verifier, image_path: str, expected_item: str, category
     return verifier.verify_image(image_path, expected_item, category)
 
 
+def cache_key(content_hash: str, expected_item: str, backend: str = 'fp32', models: str = 'both') -> str:
+    """
+    Verification cache key: image content, expected name, the models used and
+    (when not the defaults) the backend and single-model mode.
+    """
+    key = f"{content_hash}|{expected_item}|{CAPTION_MODEL}|{VQA_MODEL}"
+    if backend != 'fp32':
+        key += f"|{backend}"
+    if models != 'both':
+        key += f"|{models}-only"
+    return key
+
+
 def load_category_data(category_file: str) -> List[Dict]:
     """Load category data from JSON file."""
-    with open(category_file, 'r', encoding='utf-8') as f:
+    with open(category_file, 'r', encoding='utf-8-sig') as f:
         return json.load(f)
 
 
-def verify_all_images(api_key: str = None, categories_to_check: List[str] = None):
+def result_key(record: Dict) -> Tuple[str, str, str]:
+    """Identity of a result log record: (category, item, image)."""
+    return record['category'], record['item'], record['image']
+
+
+def _truncate_partial_line(path: str):
+    """Drop a half-written last line left behind by an interrupted run."""
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b'\n')
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        if end != size:
+            f.truncate(end)
+
+
+class ResultLog:
+    """Append-only JSONL results log: flushed after every record, fsync'd every few records or seconds."""
+    
+    def __init__(self, path: str, resume: bool = False, sync_every: int = 25, sync_seconds: float = 5.0):
+        if resume and os.path.exists(path):
+            _truncate_partial_line(path)
+            self.file = open(path, 'a', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+        self.sync_every = sync_every
+        self.sync_seconds = sync_seconds
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+    
+    def append(self, record: Dict):
+        """Write one record as a JSON line."""
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= self.sync_every or time.monotonic() - self.last_sync >= self.sync_seconds:
+            self.sync()
+    
+    def sync(self):
+        """Force written records to disk."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.sync()
+        self.file.close()
+
+
+def iter_result_log(path: str, in_order: bool = False) -> Iterator[Dict]:
+    """
+    Stream records from a results log, skipping a torn last line.
+    
+    With in_order, records are yielded in data-file order: only (order, offset)
+    pairs are held in memory, and a later record for the same item wins.
+    """
+    with open(path, 'rb') as f:
+        if not in_order:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+            return
+        
+        offsets = {}
+        while True:
+            offset = f.tell()
+            line = f.readline()
+            if not line:
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            offsets[result_key(record)] = (record.get('order', []), offset)
+        
+        for _, offset in sorted(offsets.values()):
+            f.seek(offset)
+            yield json.loads(f.readline())
+
+
+def verify_all_images(api_key: str = None, categories_to_check: List[str] = None, batch_size: int = 8,
+                      use_cache: bool = True, workers: int = 1, threads: Optional[int] = None,
+                      throttle: float = 0.0, backend: str = 'fp32', resume: bool = False,
+                      results_log: str = RESULTS_LOG, cascade: bool = False, models: str = 'both'):
     """
     Verify all images in the game against their expected content.
     
     Args:
         api_key: Not used (kept for compatibility)
         categories_to_check: List of category names to check (if None, checks all)
+        batch_size: Number of images run through the models per generate call
+        use_cache: Reuse cached answers for images whose content and name are unchanged
+        workers: Number of processes running inference, each loading its own models
+        threads: torch threads per process (default: CPU cores divided by workers)
+        throttle: Seconds to sleep after each batch (0 = no delay)
+        backend: Inference backend, one of BACKENDS
+        resume: Keep the existing results log and skip items already in it
+        results_log: JSONL file every result is appended to as soon as it is computed
+        cascade: Run the cheap VQA questions first and skip passes once a verdict is settled
+        models: 'both', or 'caption'/'vqa' to load and run a single model
+    
+    Returns:
+        The report summary dict (results themselves are in the log and report files)
     """
-    # Initialize local AI verifier (no API key needed!)
-    verifier = get_verifier()
+    if cascade and models != 'both':
+        raise ValueError("Cascade mode needs both the caption and VQA models")
+    workers = max(1, workers)
+    batch_size = max(1, batch_size)
+    if threads is None and workers > 1:
+        threads = max(1, (os.cpu_count() or 1) // workers)
+    
+    # Cached model answers from previous runs
+    cache = load_manifest(CACHE_FILE) if use_cache else {}
     
     # Load categories
     with open('categories.json', 'r', encoding='utf-8') as f:
         data = json.load(f)
         categories = data.get('categories', data) if isinstance(data, dict) else data
     
-    # Results tracking
-    all_results = []
-    incorrect_images = []
-    total_checked = 0
-    total_incorrect = 0
+    # Items finished by an interrupted run
+    done = set()
+    if resume and os.path.exists(results_log):
+        done = {result_key(r) for r in iter_result_log(results_log)}
+        print(f"Resuming: {len(done)} results already in {results_log}")
     
-    # Check each category
-    for category in categories:
+    # Plan every category first so inference can be spread across all of them
+    plan_start = time.perf_counter()
+    plans = []
+    for category_index, category in enumerate(categories):
         category_name = category['name']
         
         # Skip if we're filtering categories
@@ -202,73 +782,215 @@ def verify_all_images(api_key: str = None, categories_to_check: List[str] = None
             print(f"Skipping {category_name} - no data file found")
             continue
         
-        print(f"\n{'='*60}")
-        print(f"Checking category: {category_name}")
-        print(f"{'='*60}")
-        
         # Load items
         items = load_category_data(data_file)
         
-        # Check each item
-        for item in items:
+        # Items in data-file order: ('missing' | 'cached' | 'infer', entry, order, cached answers)
+        plan = {'name': category_name, 'items': [], 'keys': {}, 'batches': []}
+        to_infer = []
+        for item_index, item in enumerate(items):
             item_name = item.get('name', 'Unknown')
             image_path = item.get('image', '')
+            entry = (image_path, item_name, category_name)
+            if (category_name, item_name, image_path) in done:
+                continue
             
             if not image_path or not os.path.exists(image_path):
-                print(f"[!] {item_name}: Image file not found - {image_path}")
-                incorrect_images.append({
-                    'category': category_name,
-                    'item': item_name,
-                    'image': image_path,
-                    'issue': 'File not found',
-                    'confidence': 0.0
-                })
+                plan['items'].append(('missing', entry, [category_index, item_index], None))
                 continue
             
-            # Verify image
-            print(f"Checking: {item_name}...", end=' ')
-            is_correct, explanation, confidence = verify_image_with_ai(
-                verifier, image_path, item_name, category_name
-            )
+            # Split into cache hits and images that need inference
+            plan['keys'][entry] = cache_key(file_hash(image_path), item_name, backend, models)
+            cached = cache.get(plan['keys'][entry])
+            # Partial cascade answers only count as a hit for another cascade run
+            if cached and (cascade or models != 'both'
+                           or None not in (cached['caption'], cached['answer'], cached['yes_no'])):
+                plan['items'].append(('cached', entry, [category_index, item_index], cached))
+            else:
+                plan['items'].append(('infer', entry, [category_index, item_index], None))
+                to_infer.append(entry)
+        
+        plan['batches'] = [to_infer[start:start + batch_size] for start in range(0, len(to_infer), batch_size)]
+        plans.append(plan)
+    
+    all_batches = [batch for plan in plans for batch in plan['batches']]
+    timings = {'plan': time.perf_counter() - plan_start}
+    
+    with ExitStack() as stack:
+        log = stack.enter_context(ResultLog(results_log, resume=resume))
+        
+        if workers > 1 and all_batches:
+            # Each worker process loads the models once and gets its own torch thread budget
+            print(f"Starting {workers} worker processes ({threads} torch threads each)...")
+            verifier = LocalImageVerifier(load_models=False)
+            pool = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                           initargs=(threads, backend, models)))
             
-            total_checked += 1
+            def iter_worker_answers():
+                for answers, batch_timings in pool.map(_answer_batch_in_worker, all_batches,
+                                                       [throttle] * len(all_batches), [cascade] * len(all_batches)):
+                    add_timings(timings, batch_timings)
+                    yield answers
+            answer_stream = iter_worker_answers()
+        else:
+            # Nothing to run means no torch: cached answers score without it
+            if threads and all_batches:
+                set_torch_threads(threads)
+            # Initialize local AI verifier (no API key needed!)
+            verifier = get_verifier(backend, models) if all_batches else LocalImageVerifier(load_models=False)
             
-            result = {
-                'category': category_name,
-                'item': item_name,
-                'image': image_path,
-                'is_correct': is_correct,
-                'confidence': confidence,
-                'explanation': explanation
-            }
-            all_results.append(result)
+            def iter_single_process():
+                # Preprocess the next batches in the background while the models run
+                before = dict(verifier.timings)
+                for batch, preprocessed in verifier.prefetch_batches(all_batches):
+                    yield verifier.answer_batch(batch, preprocessed, cascade)
+                    if throttle > 0:
+                        time.sleep(throttle)
+                add_timings(timings, {stage: seconds - before.get(stage, 0.0)
+                                      for stage, seconds in verifier.timings.items()})
+            answer_stream = iter_single_process()
+        
+        # Check each category
+        for plan in plans:
+            category_name = plan['name']
+            print(f"\n{'='*60}")
+            print(f"Checking category: {category_name}")
+            print(f"{'='*60}")
             
-            if is_correct:
-                print(f"[OK] CORRECT (confidence: {confidence:.2f})")
-            else:
-                print(f"[X] INCORRECT (confidence: {confidence:.2f})")
-                print(f"   Reason: {explanation}")
-                total_incorrect += 1
-                incorrect_images.append(result)
+            # Data-file order: cached answers inline, inferred ones pulled batch by batch from the shared stream
+            def iter_answers():
+                pending = deque()
+                for kind, entry, order, answers in plan['items']:
+                    if kind == 'infer':
+                        if not pending:
+                            pending.extend(next(answer_stream))
+                        answers = pending.popleft()
+                    yield kind, entry, order, answers
             
-            # Rate limiting - small delay between requests (for system stability)
-            time.sleep(0.2)
+            for kind, entry, order, answers in iter_answers():
+                image_path, item_name, _ = entry
+                
+                if kind == 'missing':
+                    print(f"[!] {item_name}: Image file not found - {image_path}")
+                    log.append({
+                        'category': category_name,
+                        'item': item_name,
+                        'image': image_path,
+                        'issue': 'File not found',
+                        'is_correct': False,
+                        'confidence': 0.0,
+                        'order': order
+                    })
+                    continue
+                
+                is_correct, explanation, confidence = verifier.score_result(item_name, answers)
+                print(f"Checking: {item_name}...", end=' ')
+                
+                from_cache = kind == 'cached'
+                if not from_cache and 'error' not in answers:
+                    cache[plan['keys'][entry]] = {
+                        'caption': answers['caption'],
+                        'answer': answers['answer'],
+                        'yes_no': answers['yes_no'],
+                        'score': confidence
+                    }
+                    if 'exit_stage' in answers:
+                        cache[plan['keys'][entry]]['exit_stage'] = answers['exit_stage']
+                
+                record = {
+                    'category': category_name,
+                    'item': item_name,
+                    'image': image_path,
+                    'is_correct': is_correct,
+                    'confidence': confidence,
+                    'explanation': explanation,
+                    'cached': from_cache,
+                    'order': order
+                }
+                if not from_cache and 'exit_stage' in answers:
+                    record['exit_stage'] = answers['exit_stage']
+                log.append(record)
+                
+                cached_label = " [cached]" if from_cache else ""
+                if is_correct:
+                    print(f"[OK] CORRECT (confidence: {confidence:.2f}){cached_label}")
+                else:
+                    print(f"[X] INCORRECT (confidence: {confidence:.2f}){cached_label}")
+                    print(f"   Reason: {explanation}")
+            
+            if use_cache:
+                save_manifest(CACHE_FILE, cache)
+        
+        # Drain the stream so the last batch's timings are counted
+        for _ in answer_stream:
+            pass
+    
+    timings['total'] = time.perf_counter() - plan_start
+    return summarize_result_log(results_log, timings=timings)
+
+
+def summarize_result_log(results_log: str = RESULTS_LOG, report_file: str = 'image_verification_report.json',
+                         timings: Optional[Dict[str, float]] = None):
+    """
+    Print the verification summary and write the JSON report by streaming over
+    the results log (records are read back in data-file order, one at a time).
+    Stage timings, if given, are printed and added to the summary.
+    
+    Returns:
+        The report summary dict
+    """
+    # Totals, plus what the later passes need: per-category issue counts and checked image labels
+    total_checked = 0
+    total_incorrect = 0
+    total_cached = 0
+    issues_per_category = {}
+    checked_images = {}
+    exit_stages = {}
+    for record in iter_result_log(results_log, in_order=True):
+        if not record['is_correct']:
+            issues_per_category[record['category']] = issues_per_category.get(record['category'], 0) + 1
+        if 'issue' in record:
+            continue
+        total_checked += 1
+        total_cached += bool(record.get('cached'))
+        total_incorrect += not record['is_correct']
+        if 'exit_stage' in record:
+            exit_stages[record['exit_stage']] = exit_stages.get(record['exit_stage'], 0) + 1
+        checked_images[record['image']] = f"{record['category']} - {record['item']}"
+    total_issues = sum(issues_per_category.values())
+    
+    def iter_incorrect():
+        return (r for r in iter_result_log(results_log, in_order=True) if not r['is_correct'])
     
     # Generate report
     print(f"\n{'='*60}")
     print(f"VERIFICATION COMPLETE")
     print(f"{'='*60}")
     print(f"Total images checked: {total_checked}")
+    print(f"Reused from cache: {total_cached}")
     print(f"Correct images: {total_checked - total_incorrect}")
     print(f"Incorrect/Suspicious images: {total_incorrect}")
     print(f"Accuracy: {((total_checked - total_incorrect) / total_checked * 100) if total_checked > 0 else 0:.1f}%")
     
+    if timings:
+        peak = peak_rss_mb()
+        print("Timing (stages summed over prefetch threads and workers): " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items())
+              + (f" (peak memory {peak:.0f} MB)" if peak is not None else ""))
+    
+    # Cascade runs: where images exited, and how many per-image generate passes that saved
+    if exit_stages:
+        cascaded = sum(exit_stages.values())
+        passes_run = sum(count * (CASCADE_STAGES.index(stage) + 1) for stage, count in exit_stages.items())
+        print("Cascade exits: " + ", ".join(f"{stage} {exit_stages.get(stage, 0)}" for stage in CASCADE_STAGES))
+        print(f"Generate passes: {passes_run} of {cascaded * len(CASCADE_STAGES)} "
+              f"({(1 - passes_run / (cascaded * len(CASCADE_STAGES))) * 100:.0f}% skipped)")
+    
     # Print incorrect images summary
-    if incorrect_images:
+    if total_issues:
         print(f"\n{'='*60}")
-        print(f"INCORRECT/SUSPICIOUS IMAGES ({len(incorrect_images)} total):")
+        print(f"INCORRECT/SUSPICIOUS IMAGES ({total_issues} total):")
         print(f"{'='*60}")
-        for i, img in enumerate(incorrect_images, 1):
+        for i, img in enumerate(iter_incorrect(), 1):
             print(f"\n{i}. {img['category']} - {img['item']}")
             print(f"   File: {img['image']}")
             print(f"   Issue: {img.get('explanation', img.get('issue', 'Unknown'))}")
@@ -280,70 +1002,99 @@ def verify_all_images(api_key: str = None, categories_to_check: List[str] = None
         print(f"{'='*60}")
         print("Copy these commands to re-download incorrect images:\n")
         
-        categories_with_errors = {}
-        for img in incorrect_images:
+        # Records come back in data-file order, so each category's images are contiguous
+        current_category = None
+        for img in iter_incorrect():
             cat = img['category']
-            if cat not in categories_with_errors:
-                categories_with_errors[cat] = []
-            categories_with_errors[cat].append(img)
-        
-        for cat, images in categories_with_errors.items():
-            print(f"# Re-download {cat} category ({len(images)} images):")
-            for img in images:
-                item_name = img['item']
-                file_name = img['image'].split('/')[-1].replace('.jpg', '')
-                search_term = item_name.lower()
-                
-                # Add category-specific search terms
-                if cat == "Vegetables":
-                    search_term += " vegetable"
-                elif cat == "Fruits":
-                    search_term += " fruit"
-                elif cat == "Birds":
-                    search_term += " bird"
-                elif cat == "Flowers":
-                    search_term += " flower"
-                elif cat == "World Landmarks":
-                    search_term += " landmark monument"
-                elif cat == "Animals":
-                    search_term += " animal"
-                
-                print(f'& ".\\scripts\\download_bing_image.ps1" -searchQuery "{search_term}" -outputPath "{img["image"]}"')
-            print()
+            if cat != current_category:
+                if current_category is not None:
+                    print()
+                print(f"# Re-download {cat} category ({issues_per_category[cat]} images):")
+                current_category = cat
+            
+            item_name = img['item']
+            search_term = item_name.lower()
+            
+            # Add category-specific search terms
+            if cat == "Vegetables":
+                search_term += " vegetable"
+            elif cat == "Fruits":
+                search_term += " fruit"
+            elif cat == "Birds":
+                search_term += " bird"
+            elif cat == "Flowers":
+                search_term += " flower"
+            elif cat == "World Landmarks":
+                search_term += " landmark monument"
+            elif cat == "Animals":
+                search_term += " animal"
+            
+            print(f'& ".\\scripts\\download_bing_image.ps1" -searchQuery "{search_term}" -outputPath "{img["image"]}"')
+        print()
+    
+    # Near-duplicate pictures among the checked images (perceptual hashes are cached)
+    duplicate_pairs = find_duplicate_pairs(list(checked_images))
+    if duplicate_pairs:
+        print(f"\n{'='*60}")
+        print(f"NEAR-DUPLICATE IMAGES ({len(duplicate_pairs)} pairs):")
+        print(f"{'='*60}")
+        for pair in duplicate_pairs:
+            pair['item_a'] = checked_images[pair['image_a']]
+            pair['item_b'] = checked_images[pair['image_b']]
+            print(f"{pair['item_a']}  <->  {pair['item_b']} (pHash distance {pair['phash_distance']})")
+    
+    summary = {
+        'total_checked': total_checked,
+        'correct': total_checked - total_incorrect,
+        'incorrect': total_incorrect,
+        'accuracy_percent': ((total_checked - total_incorrect) / total_checked * 100) if total_checked > 0 else 0,
+        'cached': total_cached,
+        'near_duplicate_pairs': len(duplicate_pairs)
+    }
+    if exit_stages:
+        summary['cascade_exits'] = {stage: exit_stages.get(stage, 0) for stage in CASCADE_STAGES}
+    if timings:
+        summary['timings'] = {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    
+    # Save detailed report, streaming the result arrays straight from the log
+    def write_array(f, name, records, last=False):
+        f.write(f'  "{name}": [')
+        for i, record in enumerate(records):
+            record.pop('order', None)
+            f.write((',' if i else '') + '\n    ' + json.dumps(record, ensure_ascii=False))
+        f.write('\n  ]' + ('' if last else ',') + '\n')
     
-    # Save detailed report
-    report_file = 'image_verification_report.json'
     with open(report_file, 'w', encoding='utf-8') as f:
-        json.dump({
-            'summary': {
-                'total_checked': total_checked,
-                'correct': total_checked - total_incorrect,
-                'incorrect': total_incorrect,
-                'accuracy_percent': ((total_checked - total_incorrect) / total_checked * 100) if total_checked > 0 else 0
-            },
-            'incorrect_images': incorrect_images,
-            'all_results': all_results
-        }, f, indent=2, ensure_ascii=False)
+        f.write('{\n  "summary": ' + json.dumps(summary, ensure_ascii=False) + ',\n')
+        write_array(f, 'incorrect_images', iter_incorrect())
+        f.write('  "near_duplicates": ' + json.dumps(duplicate_pairs, ensure_ascii=False) + ',\n')
+        write_array(f, 'all_results', (r for r in iter_result_log(results_log, in_order=True) if 'issue' not in r),
+                    last=True)
+        f.write('}\n')
     
     print(f"\nDetailed report saved to: {report_file}")
     
-    return all_results, incorrect_images
+    return summary
 
 
-def verify_single_category(category_name: str, api_key: str = None):
-    """Verify images for a single category."""
-    return verify_all_images(api_key=api_key, categories_to_check=[category_name])
+def verify_single_category(category_name: str, api_key: str = None, **options):
+    """Verify images for a single category (options are passed to verify_all_images)."""
+    return verify_all_images(api_key=api_key, categories_to_check=[category_name], **options)
 
 
-def verify_specific_images(image_specs: List[Tuple[str, str, str]], api_key: str = None):
+def verify_specific_images(image_specs: List[Tuple[str, str, str]], api_key: str = None,
+                           backend: str = 'fp32', models: str = 'both', **options):
     """
     Verify specific images.
     
     Args:
         image_specs: List of tuples (image_path, expected_item, category)
         api_key: Not used (kept for compatibility)
+        backend: Inference backend, as for verify_all_images
+        models: 'both', 'caption' or 'vqa'
+        options: Other verify_all_images options; ignored here
     """
-    verifier = get_verifier()
+    verifier = get_verifier(backend, models)
     
     results = []
     for image_path, expected_item, category in image_specs:
@@ -370,22 +1121,210 @@ def verify_specific_images(image_specs: List[Tuple[str, str, str]], api_key: str
     return results
 
 
+def sample_images(sample_size: int, seed: int = 0) -> List[Tuple[str, str, str]]:
+    """Pick a fixed, reproducible sample of (image_path, expected_item, category) across all categories."""
+    with open('categories.json', 'r', encoding='utf-8') as f:
+        data = json.load(f)
+        categories = data.get('categories', data) if isinstance(data, dict) else data
+    
+    specs = []
+    for category in categories:
+        data_file = category.get('dataFile')
+        if not data_file or not os.path.exists(data_file):
+            continue
+        for item in load_category_data(data_file):
+            image_path = item.get('image', '')
+            if image_path and os.path.exists(image_path):
+                specs.append((image_path, item.get('name', 'Unknown'), category['name']))
+    
+    specs.sort()
+    return random.Random(seed).sample(specs, min(sample_size, len(specs)))
+
+
+def _benchmark_backend(backend: str, items: List[Tuple[str, str, str]], batch_size: int,
+                       threads: Optional[int]) -> Dict:
+    """Load one backend and run it over the sample (meant to run in a fresh process)."""
+    if threads:
+        set_torch_threads(threads)
+    
+    start = time.perf_counter()
+    verifier = LocalImageVerifier(backend=backend)
+    verifier.load()
+    load_seconds = time.perf_counter() - start
+    
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    answers = []
+    start = time.perf_counter()
+    for batch, preprocessed in verifier.prefetch_batches(batches):
+        answers.extend(verifier.answer_batch(batch, preprocessed))
+    seconds = time.perf_counter() - start
+    
+    return {
+        'backend': backend,
+        'load_seconds': load_seconds,
+        'seconds': seconds,
+        'images_per_sec': len(items) / seconds if seconds > 0 else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'answers': answers
+    }
+
+
+def benchmark_backends(backends: Iterable[str] = BACKENDS, sample_size: int = 48, batch_size: int = 8,
+                       threads: Optional[int] = None, min_agreement: float = 0.95, seed: int = 0,
+                       report_file: str = 'backend_benchmark_report.json'):
+    """
+    Run every backend on the same image sample and compare speed, memory and
+    agreement with the fp32 verdicts.
+    
+    Args:
+        backends: Backends to compare (fp32 always runs as the reference)
+        sample_size: Number of images in the fixed sample
+        batch_size: Images per batched generate call
+        threads: torch threads per backend process (default: torch's own choice)
+        min_agreement: Verdict agreement with fp32 needed to recommend a backend
+        seed: Sample seed, so runs compare the same images
+    """
+    backends = ['fp32'] + [b for b in backends if b != 'fp32']
+    items = sample_images(sample_size, seed)
+    if not items:
+        print("No images found to benchmark")
+        return []
+    
+    print(f"Benchmarking {', '.join(backends)} on {len(items)} images (batch size {batch_size})...")
+    
+    results = []
+    for backend in backends:
+        # A fresh process per backend keeps load time and peak memory separate
+        try:
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(_benchmark_backend, backend, items, batch_size, threads).result()
+        except Exception as e:
+            print(f"[!] {backend}: {e}")
+            continue
+        results.append(result)
+        print(f"{backend}: {result['images_per_sec']:.2f} images/sec, loaded in {result['load_seconds']:.1f}s")
+    
+    if not results or results[0]['backend'] != 'fp32':
+        print("fp32 reference run failed; nothing to compare against")
+        return results
+    
+    scorer = LocalImageVerifier(load_models=False)
+    reference = results[0]
+    reference_verdicts = [scorer.score_result(item[1], a)[0] for item, a in zip(items, reference['answers'])]
+    for result in results:
+        verdicts = [scorer.score_result(item[1], a)[0] for item, a in zip(items, result['answers'])]
+        result['agreement'] = sum(v == r for v, r in zip(verdicts, reference_verdicts)) / len(items)
+        result['same_caption'] = sum(a.get('caption') == r.get('caption')
+                                     for a, r in zip(result['answers'], reference['answers'])) / len(items)
+        result['speedup'] = result['images_per_sec'] / reference['images_per_sec'] if reference['images_per_sec'] else 0.0
+        result['disagreements'] = [{'image': item[0], 'item': item[1], 'fp32_correct': r, 'correct': v}
+                                   for item, v, r in zip(items, verdicts, reference_verdicts) if v != r]
+    
+    print(f"\n{'Backend':<8} {'img/s':>7} {'Speedup':>8} {'Load s':>7} {'Peak MB':>8} {'Agree':>7} {'Caption':>8}")
+    print("-" * 60)
+    for r in results:
+        peak = f"{r['peak_rss_mb']:.0f}" if r['peak_rss_mb'] is not None else "n/a"
+        print(f"{r['backend']:<8} {r['images_per_sec']:>7.2f} {r['speedup']:>7.2f}x {r['load_seconds']:>7.1f} "
+              f"{peak:>8} {r['agreement'] * 100:>6.1f}% {r['same_caption'] * 100:>7.1f}%")
+    
+    # Fastest backend whose verdicts still agree closely enough with fp32
+    eligible = [r for r in results if r['agreement'] >= min_agreement]
+    if eligible:
+        recommended = max(eligible, key=lambda r: r['images_per_sec'])['backend']
+        print(f"\nRecommended backend (agreement >= {min_agreement * 100:.0f}%): {recommended}")
+    else:
+        recommended = 'fp32'
+        print(f"\nNo backend reaches {min_agreement * 100:.0f}% agreement; keeping the fp32 default")
+    
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'sample': [{'image': i[0], 'item': i[1], 'category': i[2]} for i in items],
+            'batch_size': batch_size,
+            'min_agreement': min_agreement,
+            'recommended': recommended,
+            'backends': [{k: v for k, v in r.items() if k != 'answers'} for r in results]
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Benchmark report saved to: {report_file}")
+    return results
+
+
 if __name__ == "__main__":
+    import argparse
     import sys
     
+    parser = argparse.ArgumentParser(description="Verify game images with local AI models")
+    parser.add_argument('category', nargs='*', help="Category name to verify (omit for the interactive menu)")
+    parser.add_argument('--batch-size', type=int, default=8,
+                        help="Images per batched generate call (default: 8)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f"Re-run inference on every image instead of reusing {CACHE_FILE}")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Inference processes, each loading its own models (0 = one per CPU core)")
+    parser.add_argument('--threads', type=int, default=None,
+                        help="torch threads per process (default: CPU cores / workers)")
+    parser.add_argument('--throttle', type=float, default=0.0,
+                        help="Seconds to sleep after each batch (default: 0)")
+    parser.add_argument('--cascade', action='store_true',
+                        help="Ask the short VQA questions first and skip the caption once a verdict is settled")
+    parser.add_argument('--resume', action='store_true',
+                        help=f"Continue an interrupted run, skipping items already in {RESULTS_LOG}")
+    model_group = parser.add_mutually_exclusive_group()
+    model_group.add_argument('--caption-only', action='store_true',
+                             help="Load and run only the captioning model (about half the memory)")
+    model_group.add_argument('--vqa-only', action='store_true',
+                             help="Load and run only the question answering model")
+    parser.add_argument('--backend', choices=BACKENDS, default='fp32',
+                        help="Inference backend: fp32, int8 (quantized) or onnx (default: fp32)")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="Compare all backends on a fixed image sample and exit")
+    parser.add_argument('--sample-size', type=int, default=48,
+                        help="Images in the --benchmark sample (default: 48)")
+    parser.add_argument('--min-agreement', type=float, default=0.95,
+                        help="Verdict agreement with fp32 required to recommend a backend (default: 0.95)")
+    parser.add_argument('--embeddings', action='store_true',
+                        help="Zero-shot check against every name in the category using the embedding index")
+    args = parser.parse_args()
+    if args.cascade and (args.caption_only or args.vqa_only):
+        parser.error("--cascade needs both models")
+    if not 0.0 <= args.min_agreement <= 1.0:
+        parser.error("--min-agreement must be between 0 and 1")
+    
+    options = {
+        'batch_size': args.batch_size,
+        'use_cache': not args.no_cache,
+        'workers': args.workers if args.workers > 0 else (os.cpu_count() or 1),
+        'threads': args.threads,
+        'throttle': args.throttle,
+        'backend': args.backend,
+        'resume': args.resume,
+        'cascade': args.cascade,
+        'models': 'caption' if args.caption_only else 'vqa' if args.vqa_only else 'both'
+    }
+    
+    if args.benchmark:
+        benchmark_backends(sample_size=args.sample_size, batch_size=args.batch_size, threads=args.threads,
+                           min_agreement=args.min_agreement)
+        sys.exit(0)
+    
+    if args.embeddings:
+        from embedding_index import verify_with_embeddings
+        verify_with_embeddings(categories_to_check=[" ".join(args.category)] if args.category else None)
+        sys.exit(0)
+    
     print("="*60)
     print("IMAGE VERIFICATION TOOL - FREE LOCAL AI")
     print("No API Key Required - Runs on Your Computer")
     print("="*60)
+    print(f"Started in {time.perf_counter() - _START:.2f}s (models load on first use)")
     print()
     
     # Check for command line arguments
-    if len(sys.argv) > 1:
+    if args.category:
         # Command line mode: python verify_images_with_ai.py CategoryName
-        category_name = " ".join(sys.argv[1:])
+        category_name = " ".join(args.category)
         print(f"Verifying category: {category_name}")
         print()
-        verify_single_category(category_name)
+        verify_single_category(category_name, **options)
     else:
         # Interactive menu mode
         print("\nWhat would you like to do?")
@@ -404,7 +1343,7 @@ if __name__ == "__main__":
             print("[!] WARNING: This will check 500+ images and may take 30+ minutes!")
             confirm = input("Continue? (yes/no): ").strip().lower()
             if confirm == 'yes':
-                verify_all_images()
+                verify_all_images(**options)
             else:
                 print("Cancelled.")
         
@@ -427,7 +1366,7 @@ if __name__ == "__main__":
                     print("Invalid category number.")
                     sys.exit(1)
             
-            verify_single_category(cat_choice)
+            verify_single_category(cat_choice, **options)
         
         elif choice == "3":
             print("\nAvailable categories:")
@@ -462,7 +1401,7 @@ if __name__ == "__main__":
                 
                 if selected_cats:
                     print(f"\nVerifying {len(selected_cats)} categories: {', '.join(selected_cats)}")
-                    verify_all_images(categories_to_check=selected_cats)
+                    verify_all_images(categories_to_check=selected_cats, **options)
                 else:
                     print("No valid categories selected.")
         
@@ -483,7 +1422,7 @@ if __name__ == "__main__":
                     print("Invalid format. Use: image_path,expected_item,category")
             
             if image_specs:
-                verify_specific_images(image_specs)
+                verify_specific_images(image_specs, **options)
             else:
                 print("No images specified.")
         